@@ -1,12 +1,18 @@
 import pandas as pd
 import os
+import argparse
+import time
 from datetime import datetime
 import logging
-from tqdm import tqdm
-
-# Set up logging
-logging.basicConfig(filename='census_import_log.txt', level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+from note_template import NoteTemplate, format_value
+from import_manifest import hash_row
+from record_index import add_records_options, open_records, record_hash
+from date_normalize import normalize_dates
+from sheet_cache import DEFAULT_CACHE_DIR, read_sheet
+from note_writer import NoteWriter, write_note
+from census_households import HouseholdBuilder, add_household_options
+from import_pipeline import add_run_options, add_stream_options, run_importers, setup_logging, stream_importers
+from run_report import timer
 
 # Define the template as a string
 TEMPLATE = """---
@@ -33,78 +39,200 @@ theme1: {{T}}
 
 #Llanychan #Taber-Project #Census #{{Date}}
 """
+NOTE_TEMPLATE = NoteTemplate(TEMPLATE)
 
 def clean_filename(filename):
     # Remove any characters that are not alphanumeric, space, or hyphen
     return ''.join(c for c in filename if c.isalnum() or c in [' ', '-']).strip()
 
-def create_note(row, output_dir):
-    try:
-        logging.info(f"Starting to create note for census: {row['Article']}")
+def note_filename(row):
+    # Create filename (without date)
+    filename = f"{clean_filename(row['Article'])}.md"
 
-        # Create filename (without date)
-        filename = f"{clean_filename(row['Article'])}.md"
+    # Ensure the filename isn't too long (adjust max_length as needed)
+    max_length = 255  # Maximum filename length for most file systems
+    if len(filename) > max_length:
+        filename = filename[:max_length - 3] + '.md'
+    return filename
 
-        # Ensure the filename isn't too long (adjust max_length as needed)
-        max_length = 255  # Maximum filename length for most file systems
-        if len(filename) > max_length:
-            filename = filename[:max_length - 3] + '.md'
+def create_note(row, output_dir, template=NOTE_TEMPLATE, writer=None):
+    try:
+        logging.info(f"Starting to create note for census: {row['Article']}")
 
+        filename = note_filename(row)
         filepath = os.path.join(output_dir, filename)
 
-        # Populate the template
-        content = TEMPLATE
-        additional_properties = ""
-        for key, value in row.items():
-            if pd.notna(value) and key not in ['Date', 'Article', 'T', 'Src', 'Fmt']:
-                additional_properties += f"{key}: {value}\n"
-            content = content.replace(f"{{{{{key}}}}}", str(value) if pd.notna(value) else "")
-
-        content = content.replace("{{additional_properties}}", additional_properties.strip())
+        # Populate the template in a single pass
+        values = dict(row)
+        additional_properties = [f"{key}: {format_value(value)}" for key, value in values.items()
+                                 if pd.notna(value) and key not in ['Date', 'Article', 'T', 'Src', 'Fmt']]
+        values['additional_properties'] = "\n".join(additional_properties).strip()
+        with timer.stage('render'):
+            content = template.render(values)
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Hand the note to the write-behind stage if there is one
+        if writer is not None:
+            writer.write(filepath, content)
+        else:
+            write_note(filepath, content)
 
         logging.info(f"Successfully created note: {filename}")
-        return True
+        return filepath
 
     except Exception as e:
         logging.error(f"Error creating note for {row['Article']}: {str(e)}")
-        return False
-
-def main():
-    input_file = r"G:\Projects\Clwyd Hall\_Resources\Clwyd Hall Project.xlsm"
-    output_dir = r"G:\Projects\Obsidian\Vaultest\Census"
+        return None
+
+class CensusImporter:
+    name = 'census'
+    sources = ('CEN',)
+    # Every non-empty column becomes a property of the note, so all of them are read
+    columns = None
+
+    def __init__(self, output_dir, template=NOTE_TEMPLATE, writer_threads=4, records=None, household_key=None,
+                 full=False):
+        self.output_dir = output_dir
+        self.template = template
+        # Optional RecordIndex (SQLite) kept in step with the notes
+        self.records_db = records
+        # With a household key, rows are grouped into household notes written by finish()
+        self.households = HouseholdBuilder(output_dir, household_key, full) if household_key else None
+        # Row labels to render; the rest are taken as current (set by watch mode)
+        self.only = None
+        self.writer = NoteWriter(writer_threads) if writer_threads > 0 else None
+        self.render_time = 0.0
+        self.records = 0
+        self.notes_created = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+    def plan(self, df_filtered):
+        self.records += len(df_filtered)
+        years = pd.Series(pd.NA, index=df_filtered.index, dtype='Int64')
+        if 'Date' in df_filtered.columns:
+            # Write valid dates in normalized form; anything else stays as typed
+            dates = normalize_dates(df_filtered['Date'])
+            df_filtered = df_filtered.assign(Date=dates['date'].where(dates['valid'], df_filtered['Date']))
+            years = dates['year']
+        if self.households is not None:
+            # Unchanged households are skipped when written, so watch mode's only is not needed
+            self.households.add(df_filtered, years)
+            return []
+        if self.only is not None:
+            current = ~df_filtered.index.isin(list(self.only))
+            if self.records_db is not None:
+                for row in df_filtered[current].to_dict('records'):
+                    self.records_db.keep(os.path.join(self.output_dir, note_filename(row)))
+            df_filtered, years = df_filtered[~current], years[~current]
+        # Plain dict records avoid building a pandas Series for every row. The year travels
+        # alongside for the records database, so it does not become a note property.
+        return list(zip(df_filtered.index, df_filtered.to_dict('records'), years.astype(object)))
+
+    def render(self, item):
+        index, row, year = item
+        start = time.perf_counter()
+        try:
+            logging.debug(f"Processing row {index + 1}")
+            filepath = create_note(row, self.output_dir, self.template, self.writer)
+            if filepath:
+                self.notes_created += 1
+                if self.records_db is not None:
+                    self.add_record(index, row, year, filepath)
+        except Exception as e:
+            logging.error(f"Error processing row {index + 1}: {str(e)}")
+        self.render_time += time.perf_counter() - start
+
+    def add_record(self, index, row, year, filepath):
+        # The row number is stored too, so rows inserted or deleted above this one update it.
+        # 'names' marks records that carry the person's name, so older ones are refreshed.
+        hash_value = record_hash(hash_row(row), index, 'names')
+        if self.records_db.needs(filepath, hash_value):
+            # Each census row is one person, so its Article is also the name it is found by,
+            # as in the household records
+            article = format_value(row.get('Article'))
+            self.records_db.add(filepath, hash_value, src=row.get('Src'), date=format_value(row.get('Date')) or None,
+                                year=None if pd.isna(year) else int(year), article=article,
+                                themes=format_value(row.get('T')) or None, names=article or None,
+                                places=format_value(row.get('Place_1')) or None, excel_row=index + 2)
+
+    def add_household_records(self):
+        # One record per household note, found by any member's name or place
+        for filename, (key_values, members) in self.households.notes.items():
+            filepath = os.path.join(self.households.households_dir, filename)
+            hash_value = self.households.state.get(filename)
+            if hash_value is None or not self.records_db.needs(filepath, hash_value):
+                continue
+            year = dict(zip(self.households.key, key_values)).get('year')
+            names = dict.fromkeys(format_value(member.get('Article')) for member in members)
+            places = dict.fromkeys(format_value(member.get('Place_1')) for member in members)
+            self.records_db.add(filepath, hash_value, src=self.sources[0], year=int(year) if year else None,
+                                article=' '.join(value for value in key_values if value),
+                                names='; '.join(filter(None, names)) or None,
+                                places='; '.join(filter(None, places)) or None)
+
+    def finish(self):
+        household_summary = {}
+        if self.households is not None:
+            household_summary = self.households.write()
+            if self.records_db is not None:
+                self.add_household_records()
+        write_summary = {}
+        if self.writer is not None:
+            write_summary = self.writer.close()
+            # Notes that never reached the disk are kept out of the records database
+            if self.records_db is not None:
+                for filepath in self.writer.failed:
+                    self.records_db.forget(filepath)
+        records_summary = self.records_db.finish(self.sources) if self.records_db is not None else {}
+        return {'Processed census records': self.records, 'Notes created': self.notes_created,
+                'Render time (s)': round(self.render_time, 3), **household_summary, **records_summary,
+                **write_summary}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import census records from the project workbook into Obsidian")
+    parser.add_argument('--input', default=r"G:\Projects\Clwyd Hall\_Resources\Clwyd Hall Project.xlsm")
+    parser.add_argument('--output', default=r"G:\Projects\Obsidian\Vaultest\Census")
+    parser.add_argument('--template', help="Markdown note template file (defaults to the built-in TEMPLATE)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help="Folder for cached snapshots of the parsed sheet")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the workbook")
+    parser.add_argument('--writer-threads', type=int, default=4,
+                        help="Number of threads writing notes behind rendering (0 = write inline)")
+    parser.add_argument('--full', action='store_true', help="Rewrite every household note")
+    add_household_options(parser)
+    add_records_options(parser)
+    add_stream_options(parser)
+    add_run_options(parser, 'census_import_report.json')
+    args = parser.parse_args(argv)
+
+    setup_logging('census_import_log.txt', args.log_level)
+    input_file = args.input
     sheet_name = "Newspapers"
+    template = NoteTemplate.from_file(args.template) if args.template else NOTE_TEMPLATE
 
-    os.makedirs(output_dir, exist_ok=True)
+    records = None
 
     try:
-        logging.info(f"Reading Excel file: {input_file}")
-        df = pd.read_excel(input_file, sheet_name=sheet_name, engine='openpyxl')
-        logging.info(f"Successfully read {len(df)} records from Excel")
-
-        # Filter rows where Src is CEN
-        df_filtered = df[df['Src'] == 'CEN']
-
-        notes_created = 0
-
-        for index, row in tqdm(df_filtered.iterrows(), total=len(df_filtered), desc="Processing census records"):
-            try:
-                logging.debug(f"Processing row {index + 1}")
-                if create_note(row, output_dir):
-                    notes_created += 1
-            except Exception as e:
-                logging.error(f"Error processing row {index + 1}: {str(e)}")
-
-        print(f"\nProcessed {len(df_filtered)} census records")
-        print(f"Notes created: {notes_created}")
-
-        logging.info(f"Processed {len(df_filtered)} census records")
-        logging.info(f"Notes created: {notes_created}")
+        records = open_records(args, args.output)
+        importer = CensusImporter(args.output, template, writer_threads=args.writer_threads, records=records,
+                                  household_key=args.household_key if args.households else None, full=args.full)
+
+        if args.stream:
+            logging.info(f"Streaming Excel file: {input_file}")
+            summaries = stream_importers(input_file, sheet_name, [importer], args.chunk_size,
+                                         desc="Processing census records")
+        else:
+            logging.info(f"Reading Excel file: {input_file}")
+            df = read_sheet(input_file, sheet_name, None if args.no_cache else args.cache_dir)
+            logging.info(f"Successfully read {len(df)} records from Excel")
+
+            summaries = run_importers(df, [importer], desc="Processing census records")
+        timer.write_report(args.report, input=input_file, summaries=dict(summaries))
 
     except Exception as e:
         logging.error(f"Error processing Excel file: {str(e)}")
+    finally:
+        if records is not None:
+            records.close()
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -1,17 +1,28 @@
 import pandas as pd
 import os
+import argparse
 from datetime import datetime
 import openpyxl
 import logging
 import re
 import fitz  # PyMuPDF
 from PIL import Image
+import time
 import traceback
-from tqdm import tqdm
-
-# Set up logging
-logging.basicConfig(filename='newspaper_import_log.txt', level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+from concurrent.futures import ProcessPoolExecutor
+from import_manifest import ImportManifest, hash_row
+from thumbnail_store import DEFAULT_PROFILES, ThumbnailStore, parse_profiles
+from note_template import NoteTemplate, format_value
+from sheet_cache import DEFAULT_CACHE_DIR, read_sheet
+from row_prep import INPUT_COLUMNS, NAME_COLUMNS, PLACE_COLUMNS, THEME_COLUMNS, prepare_rows
+from record_index import add_records_options, joined, open_records, record_hash
+from image_index import ImageIndex
+from note_writer import NoteWriter, write_note
+from index_notes import IndexBuilder
+from raster_decode import DEFAULT_MAX_DECODE_MB, decode_raster
+from pdf_text import TEXT_DIRNAME, TextCache, save_text, transcript_section
+from import_pipeline import add_run_options, add_stream_options, run_importers, setup_logging, stream_importers
+from run_report import timer
 
 # Define the template for markdown notes
 TEMPLATE = """---
@@ -32,6 +43,7 @@ places:
 source: {{Src}}
 format: {{Fmt}}
 transcribed: {{Transcribed}}
+pages: {{pages}}
 last_imported: {{last_imported}}
 ---
 
@@ -45,7 +57,7 @@ last_imported: {{last_imported}}
 {{locations}}
 
 ## Thumbnail
-![[{{thumbnail}}]]
+{{thumbnail_embed}}
 
 ## Source Information
 - Newspaper: {{Newspaper_or_Source}}
@@ -53,11 +65,20 @@ last_imported: {{last_imported}}
 - [Online Source]({{Address}})
 
 ## Links
-- [[{{Full_Filename}}|Local File]]
-
+- {{local_file_link}}
+{{transcript}}
 ## Tags
 {{tags}}
 """
+NOTE_TEMPLATE = NoteTemplate(TEMPLATE)
+
+# Placeholders filled in by create_note rather than taken from a workbook column; every
+# thumbnail profile adds thumbnail_<name> and thumbnail_embed_<name>
+COMPUTED_FIELDS = {'last_imported', 'local_file_link', 'thumbnail', 'thumbnail_embed', 'pages', 'transcript'}
+
+
+def thumbnail_fields(profiles):
+    return {f"{field}_{profile.name}" for profile in profiles for field in ('thumbnail', 'thumbnail_embed')}
 
 
 def clean_filename(filename):
@@ -74,188 +95,572 @@ def clean_filename(filename):
     return cleaned
 
 
-def create_thumbnail(file_path, thumbnails_dir, size=(300, 300)):
+def render_pdf_pixmap(page, size=(300, 300), grayscale=False):
+    # Render straight at the scale that fits the thumbnail box (never above 72 dpi,
+    # matching the old full-page render) instead of rendering the whole page and shrinking it
+    rect = page.rect
+    scale = min(1.0, size[0] / rect.width, size[1] / rect.height)
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    return page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=colorspace, alpha=False)
+
+
+def save_thumbnails(img, outputs):
+    # Each profile is reduced from the same decoded image; outputs run largest first.
+    # Write to a temporary file first: an existing thumbnail is treated as up to date
+    for thumbnail_path, profile in outputs:
+        thumb = img.copy() if len(outputs) > 1 else img
+        thumb.thumbnail(profile.size)
+        if profile.grayscale and thumb.mode != 'L':
+            thumb = thumb.convert('L')
+        tmp_path = thumbnail_path + '.tmp'
+        try:
+            thumb.save(tmp_path, profile.fmt, quality=profile.quality)
+            os.replace(tmp_path, thumbnail_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def is_pdf(file_path):
+    return file_path.lower().endswith('.pdf')
+
+
+def render_thumbnail(file_path, outputs, text_path=None, max_decode_bytes=DEFAULT_MAX_DECODE_MB * 1000000):
+    # outputs: (thumbnail path, profile) pairs. The source is decoded once, at the
+    # largest size any of them needs. For a PDF given a text_path, the same open also
+    # saves the page count and text layer there. Image scans whose decode would need
+    # more than max_decode_bytes are refused.
+    outputs = sorted(outputs, key=lambda output: output[1].size[0] * output[1].size[1], reverse=True)
+    box = (max(profile.size[0] for _, profile in outputs), max(profile.size[1] for _, profile in outputs)) \
+        if outputs else None
+    if is_pdf(file_path):
+        with fitz.open(file_path) as doc:
+            if text_path:
+                save_text(doc, text_path)
+            if outputs:
+                grayscale = all(profile.grayscale for _, profile in outputs)
+                pix = render_pdf_pixmap(doc[0], box, grayscale)
+                mode = "L" if grayscale else "RGB"
+                # Wrap the pixmap buffer rather than copying pix.samples; pix stays alive until saved
+                img = Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride, 1)
+                save_thumbnails(img, outputs)
+    elif outputs:
+        grayscale = all(profile.grayscale for _, profile in outputs)
+        save_thumbnails(decode_raster(file_path, box, grayscale, max_decode_bytes), outputs)
+
+
+def create_thumbnail(file_path, thumbnails_dir, store=None, source_hash=None, text_path=None,
+                     max_decode_bytes=DEFAULT_MAX_DECODE_MB * 1000000):
+    # Returns {profile name: thumbnail filename}, rendering only the profiles not on disk
+    # yet. A text_path asks for a PDF's text layer to be saved from the same open.
     try:
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        thumbnail_filename = f"thumb_{clean_filename(base_name)}.jpg"
-        thumbnail_path = os.path.join(thumbnails_dir, thumbnail_filename)
-
-        if file_path.lower().endswith('.pdf'):
-            doc = fitz.open(file_path)
-            pix = doc[0].get_pixmap()
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            img.thumbnail(size)
-            img.save(thumbnail_path, 'JPEG')
-        else:
-            with Image.open(file_path) as img:
-                if img.mode in ('P', 'RGBA', 'LA'):
-                    img = img.convert('RGB')
-                img.thumbnail(size)
-                img.save(thumbnail_path, 'JPEG')
-
-        logging.info(f"Thumbnail created: {thumbnail_path}")
-        return thumbnail_filename
+        if store is None:
+            store = ThumbnailStore(thumbnails_dir)
+        names, missing = store.lookup(file_path, source_hash)
+        if not missing:
+            if text_path:
+                with timer.stage('pdf_text', file_path):
+                    render_thumbnail(file_path, [], text_path)
+            logging.info(f"Thumbnails up to date: {file_path}")
+            return names
+
+        with timer.stage('thumbnail', file_path):
+            render_thumbnail(file_path, missing, text_path, max_decode_bytes)
+        for thumbnail_path, profile in missing:
+            logging.info(f"Thumbnail created ({profile.name}): {thumbnail_path}")
+        return names
     except Exception as e:
         logging.error(f"Error creating thumbnail for {file_path}: {str(e)}")
         logging.debug(traceback.format_exc())
         return None
 
 
-def create_note(row, articles_dir, thumbnails_dir, images_dir):
+def thumbnail_job(file_path, outputs, text_path=None, max_decode_bytes=DEFAULT_MAX_DECODE_MB * 1000000):
+    # Runs in a worker process; errors and timings are handed back to the parent
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        render_thumbnail(file_path, outputs, text_path, max_decode_bytes)
+        result = None, None
+    except Exception as e:
+        result = str(e), traceback.format_exc()
+    return result + (time.perf_counter() - wall_start, time.process_time() - cpu_start)
+
+
+def collect_thumbnail(future, file_path, names):
+    # Wait for pooled thumbnails and log the outcome the same way create_thumbnail does
+    with timer.stage('thumbnail_wait'):
+        error, error_traceback, wall, cpu = future.result()
+    # Rows sharing a source share one future; count its work once
+    if not getattr(future, 'timed', False):
+        future.timed = True
+        timer.add('thumbnail', wall, cpu)
+        timer.record_outlier('thumbnail', file_path, wall)
+    if error is not None:
+        logging.error(f"Error creating thumbnail for {file_path}: {error}")
+        logging.debug(error_traceback)
+        return None
+    logging.info(f"Thumbnails created: {file_path}")
+    return names
+
+
+def create_note(row, articles_dir, thumbnails_dir, images_dir, thumbnail_future=None, thumbnail_store=None,
+                image_hash=None, template=NOTE_TEMPLATE, writer=None, image_index=None, text_cache=None,
+                max_decode_bytes=DEFAULT_MAX_DECODE_MB * 1000000):
     try:
         logging.info(f"Starting to create note for article: {row['Article']}")
 
-        # Create filename
-        filename = f"{clean_filename(row['Article'])}.md"
-        if len(filename) > 255:
-            filename = filename[:252] + '.md'
+        # The people, locations, tags and filename fields were prepared for the whole sheet
+        # by prepare_rows, so only the per-file work is left here
+        filename = row['note_filename']
         filepath = os.path.join(articles_dir, filename)
 
-        # Populate the template
-        content = TEMPLATE
-        for key, value in row.items():
-            if pd.notna(value):
-                content = content.replace(f"{{{{{key}}}}}", str(value))
-            else:
-                content = content.replace(f"{{{{{key}}}}}", "")
-
-        content = content.replace("{{last_imported}}", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-        # Process people involved
-        people_involved = []
-        if pd.notna(row.get('Name_1')):
-            people_involved.append(f"- {row['Name_1']}")
-        if pd.notna(row.get('Name_2')):
-            people_involved.append(f"- {row['Name_2']}")
-        content = content.replace("{{people_involved}}", "\n".join(people_involved))
-
-        # Process locations
-        locations = []
-        if pd.notna(row.get('Place_1')):
-            locations.append(f"- {row['Place_1']}")
-        if pd.notna(row.get('Place_2')):
-            locations.append(f"- {row['Place_2']}")
-        content = content.replace("{{locations}}", "\n".join(locations))
-
-        # Process tags
-        tags = [f"#Source-{row.get('Src', '')}"]
-
-        # Add Theme tags
-        if pd.notna(row.get('T')):
-            tags.append(f"#Theme-{row['T'].replace(' ', '-')}")
-        for i in range(2, 6):  # This will cover Theme_2 to Theme_5
-            if pd.notna(row.get(f'Theme_{i}')):
-                tags.append(f"#Theme-{row[f'Theme_{i}'].replace(' ', '-')}")
-
-        # Add Person tags
-        for i in range(1, 3):  # This will cover Name_1 and Name_2
-            if pd.notna(row.get(f'Name_{i}')):
-                tags.append(f"#Person-{row[f'Name_{i}'].replace(' ', '-')}")
-
-        # Add Place tags
-        for i in range(1, 3):  # This will cover Place_1 and Place_2
-            if pd.notna(row.get(f'Place_{i}')):
-                tags.append(f"#Place-{row[f'Place_{i}'].replace(' ', '-')}")
-
-        # Add Year tag
-        if pd.notna(row.get('Date')):
-            tags.append(f"#Year-{row['Date'][:4]}")  # Assuming Date is in YYYY-MM-DD format
-
-        content = content.replace("{{tags}}", " ".join(tags))
+        # Collect every placeholder value, then render the template in a single pass
+        values = dict(row)
+        values['last_imported'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Handle thumbnail and local file link
+        if thumbnail_store is None:
+            thumbnail_store = ThumbnailStore(thumbnails_dir)
         thumbnail_created = False
-        local_file_path = os.path.join(images_dir, row.get('Full_Filename', ''))
+        thumbnail_failed = False
+        thumbnails = None
+        values['local_file_link'] = ""
+        values['pages'] = ""
+        values['transcript'] = ""
+        for field in {'thumbnail', 'thumbnail_embed'} | thumbnail_fields(thumbnail_store.profiles):
+            values[field] = ""
+        local_file_path = os.path.join(images_dir, row['Full_Filename']) if pd.notna(row['Full_Filename']) else None
         logging.debug(f"Checking for file: {local_file_path}")
-        if pd.notna(local_file_path) and os.path.exists(local_file_path):
+        with timer.stage('exists_check'):
+            if image_index is not None:
+                # Resolved against the in-memory scan of Images/, tolerating case and extension
+                image = image_index.resolve(row['Full_Filename'])
+                local_file_exists = image is not None
+                if image is not None:
+                    local_file_path = image.path
+            else:
+                local_file_exists = local_file_path is not None and os.path.exists(local_file_path)
+        if local_file_exists:
             file_name = clean_filename(os.path.basename(local_file_path))
             clean_local_path = f"Images/{file_name}"
-            content = content.replace("[[{{Full_Filename}}|Local File]]", f"[[{clean_local_path}|Local File]]")
-
-            thumbnail_result = create_thumbnail(local_file_path, thumbnails_dir)
-            if thumbnail_result:
-                clean_thumbnail_name = clean_filename(thumbnail_result)
-                content = content.replace("{{thumbnail}}", f"thumbnails/{clean_thumbnail_name}")
+            values['local_file_link'] = f"[[{clean_local_path}|Local File]]"
+
+            # PDF text is cached by content hash; it is only read when not cached yet,
+            # and then from the same open as the thumbnail
+            text_path = None
+            if text_cache is not None and is_pdf(local_file_path):
+                if image_hash is None:
+                    image_hash = thumbnail_store.source_hash(local_file_path)
+                text_path = text_cache.path(image_hash)
+            if thumbnail_future is not None:
+                thumbnails = collect_thumbnail(thumbnail_future, local_file_path,
+                                               thumbnail_store.names(local_file_path, image_hash))
+            else:
+                needs_text = text_path is not None and not os.path.exists(text_path)
+                thumbnails = create_thumbnail(local_file_path, thumbnails_dir, store=thumbnail_store,
+                                              source_hash=image_hash, text_path=text_path if needs_text else None,
+                                              max_decode_bytes=max_decode_bytes)
+                if needs_text:
+                    text_cache.extracted += 1
+                elif text_path is not None:
+                    text_cache.reused += 1
+            if text_path is not None:
+                text = text_cache.load(image_hash)
+                if text is not None:
+                    values['pages'] = text['pages']
+                    values['transcript'] = transcript_section(text)
+            if thumbnails:
+                # The bare {{thumbnail}} fields use the smallest profile
+                smallest = thumbnail_store.profiles[0].name
+                for profile_name, thumbnail_filename in [(None, thumbnails[smallest]), *thumbnails.items()]:
+                    suffix = f"_{profile_name}" if profile_name else ""
+                    values[f'thumbnail{suffix}'] = f"thumbnails/{thumbnail_filename}"
+                    values[f'thumbnail_embed{suffix}'] = f"![[thumbnails/{thumbnail_filename}]]"
+                thumbnail_store.reference(thumbnails)
                 thumbnail_created = True
             else:
-                content = content.replace("![[{{thumbnail}}]]", "")
                 logging.warning(f"Failed to create thumbnail for: {local_file_path}")
+                thumbnail_failed = True
         else:
-            content = content.replace("[[{{Full_Filename}}|Local File]]", "")
-            content = content.replace("![[{{thumbnail}}]]", "")
             logging.warning(f"No local file found for article: {row['Article']} at path: {local_file_path}")
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        with timer.stage('render'):
+            content = template.render(values)
+
+        # Hand the note to the write-behind stage if there is one
+        if writer is not None:
+            writer.write(filepath, content)
+        else:
+            write_note(filepath, content)
 
         logging.info(f"Successfully created note: {filename}")
-        return {"success": True, "thumbnail_created": thumbnail_created}
+        return {"success": True, "thumbnail_created": thumbnail_created, "thumbnail_failed": thumbnail_failed,
+                "thumbnails": thumbnails}
     except Exception as e:
         logging.error(f"Error creating note for {row.get('Article', 'Unknown')}: {str(e)}")
         logging.debug(traceback.format_exc())
         return None
 
 
-def main():
-    input_file = r"G:/Projects/Clwyd Hall/_Resources/Clwyd Hall Project.xlsm"
-    output_dir = r"G:/Projects/Obsidian/Vaultez/Newspapers"
-    sheet_name = "Newspapers"
-    images_dir = os.path.join(output_dir, 'Images')
-    articles_dir = os.path.join(output_dir, 'Articles')
-    thumbnails_dir = os.path.join(output_dir, 'thumbnails')
-
-    # Create necessary directories
-    os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(images_dir, exist_ok=True)
-    os.makedirs(articles_dir, exist_ok=True)
-    os.makedirs(thumbnails_dir, exist_ok=True)
-
-    try:
-        logging.info(f"Reading Excel file: {input_file}")
-        df = pd.read_excel(input_file, sheet_name=sheet_name, engine='openpyxl')
-        logging.info(f"Successfully read {len(df)} records from Excel")
-
-        print("Columns in the DataFrame:")
-        print(df.columns)
-
-        # Filter rows where Src is NC, BN, or WN
-        df_filtered = df[df['Src'].isin(['NC', 'BN', 'WN'])]
-
-        # Update Full_Filename to contain only the filename
-        df_filtered['Full_Filename'] = df_filtered['Full_Filename'].apply(os.path.basename)
-
-        notes_created = 0
-        thumbnails_created = 0
-
-        for index, row in tqdm(df_filtered.iterrows(), total=len(df_filtered), desc="Processing records"):
+class NewspaperImporter:
+    name = 'newspapers'
+    sources = ('NC', 'BN', 'WN')
+
+    def __init__(self, output_dir, template=NOTE_TEMPLATE, full=False, workers=1, writer_threads=4, index=True,
+                 thumbnail_profiles=DEFAULT_PROFILES, thumbnail_budget=None, records=None,
+                 max_decode_bytes=DEFAULT_MAX_DECODE_MB * 1000000):
+        self.output_dir = output_dir
+        self.template = template
+        self.workers = workers
+        self.writer = NoteWriter(writer_threads) if writer_threads > 0 else None
+        self.render_time = 0.0
+        self.images_dir = os.path.join(output_dir, 'Images')
+        self.articles_dir = os.path.join(output_dir, 'Articles')
+        self.thumbnails_dir = os.path.join(output_dir, 'thumbnails')
+
+        # Create necessary directories
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(self.images_dir, exist_ok=True)
+        os.makedirs(self.articles_dir, exist_ok=True)
+        os.makedirs(self.thumbnails_dir, exist_ok=True)
+
+        # Load the manifest of the previous run so unchanged rows can be skipped
+        self.manifest = ImportManifest(output_dir) if full else ImportManifest.load(output_dir)
+        self.thumbnail_store = ThumbnailStore(self.thumbnails_dir, thumbnail_profiles, self.manifest)
+        # Earlier versions kept a second cache of source hashes next to the thumbnails
+        try:
+            os.remove(os.path.join(self.thumbnails_dir, '.thumbnail_store.json'))
+        except OSError:
+            pass
+        # Warn when the thumbnails the notes use add up to more than this many bytes
+        self.thumbnail_budget = thumbnail_budget
+        # Memory one image scan may take to decode; larger scans get no thumbnail
+        self.max_decode_bytes = max_decode_bytes
+        self.text_cache = TextCache(os.path.join(output_dir, TEXT_DIRNAME))
+        # Optional RecordIndex (SQLite) kept in step with the notes
+        self.records_db = records
+        # Person, place and theme hub notes, filled in while the rows are classified
+        self.index = IndexBuilder(output_dir, full=full) if index else None
+        self.executor = None
+        self.image_index = None
+        # Row labels to classify; the rest are taken as current (set by watch mode)
+        self.only = None
+        self.thumbnail_jobs = {}
+        self.thumbnail_futures = {}
+        self.seen_keys = set()
+        self.records = 0
+        self.invalid_dates = 0
+        self.notes_created = 0
+        self.thumbnails_created = 0
+        self.thumbnails_failed = 0
+        self.row_counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+
+    @property
+    def columns(self):
+        return set(INPUT_COLUMNS) | self.template.placeholders
+
+    def plan(self, df_filtered):
+        # Called once for the whole sheet, or once per chunk when streaming
+        self.records += len(df_filtered)
+        # Only the columns a streamed read keeps, so both modes hash a row the same
+        df_filtered = df_filtered[[name for name in df_filtered.columns if name in self.columns or name == 'Src']]
+
+        # Derive filenames, tags, people and locations for all rows at once; this also
+        # reduces Full_Filename to the bare filename
+        with timer.stage('prepare'):
+            df_filtered = prepare_rows(df_filtered)
+
+        bad_dates = df_filtered[df_filtered['date_problem'] != '']
+        self.invalid_dates += len(bad_dates)
+        for index, row in bad_dates[['Article', 'Date', 'date_problem']].iterrows():
+            logging.warning(f"Row {index + 1}: invalid Date {row['Date']!r} ({row['date_problem']}), "
+                            f"no #Year- tag. Article: {row['Article']}")
+
+        if self.image_index is None:
+            computed = COMPUTED_FIELDS | thumbnail_fields(self.thumbnail_store.profiles)
+            missing = self.template.missing(set(df_filtered.columns) | computed)
+            if missing:
+                logging.warning(
+                    f"Template placeholders with no matching column will render empty: {', '.join(missing)}")
+
+            # Scan Images/ once instead of checking each row's file on the (network) drive
+            self.image_index = ImageIndex(self.images_dir)
+
+        pending = []
+        classify_start = time.perf_counter()
+        classify_cpu = time.thread_time()
+        for index, row in zip(df_filtered.index, df_filtered.to_dict('records')):
             try:
                 logging.debug(f"Processing row {index + 1}")
-                full_file_path = os.path.join(images_dir, row['Full_Filename'])
+                image = self.image_index.resolve(row['Full_Filename'])
+                full_file_path = image.path if image is not None else None
                 logging.debug(f"Attempting to access file: {full_file_path}")
-                result = create_note(row, articles_dir, thumbnails_dir, images_dir)
-                if result and result['success']:
-                    notes_created += 1
-                    if result['thumbnail_created']:
-                        thumbnails_created += 1
-                else:
-                    logging.warning(
-                        f"Failed to create note for row {index + 1}. Article: {row.get('Article', 'Unknown')}")
+
+                key = row['note_filename']
+                self.seen_keys.add(key)
+                if self.index is not None:
+                    self.index.add(row)
+                if self.only is not None and index not in self.only:
+                    # Known to be unchanged, so skip hashing; keep its state from being pruned
+                    self.row_counts['unchanged'] += 1
+                    self.thumbnail_store.reference(self.manifest.thumbnails(key))
+                    if image is not None:
+                        self.manifest.seen_images.add(full_file_path)
+                    if self.records_db is not None:
+                        self.records_db.keep(os.path.join(self.articles_dir, key))
+                    continue
+                # The resolved file name is part of the note (its link) and the thumbnail
+                # profiles decide which files it embeds, so both count as row content
+                row_hash = hash_row({**row, 'resolved_image': image.name if image is not None else '',
+                                     'thumbnail_profiles': self.thumbnail_store.signature}, self.template.text)
+                image_hash = None
+                if image is not None:
+                    image_hash = self.manifest.image_hash(full_file_path, (image.size, image.mtime_ns))
+                status = self.manifest.status(key, row_hash, image_hash, os.path.join(self.articles_dir, key),
+                                              self.thumbnails_dir)
+                if status == 'unchanged':
+                    self.row_counts['unchanged'] += 1
+                    self.thumbnail_store.reference(self.manifest.thumbnails(key))
+                    self.add_record(index, row, row_hash, image_hash, self.manifest.thumbnails(key))
+                    continue
+                pending.append((index, row, key, status, row_hash, image_hash, full_file_path))
             except Exception as e:
                 logging.error(
                     f"Error processing row {index + 1}. Article: {row.get('Article', 'Unknown')}. Error: {str(e)}")
                 logging.debug(traceback.format_exc())
+        timer.add('classify', time.perf_counter() - classify_start, time.thread_time() - classify_cpu)
+
+        # Fan thumbnails out to worker processes up front; notes are rendered in row order
+        # as each row's thumbnail completes, so the output is the same as a serial run
+        if self.workers > 1 and pending:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            jobs = self.thumbnail_jobs
+            # Finished jobs have left their thumbnail on disk, so later chunks find it there
+            for thumbnail_filename in [name for name, future in jobs.items() if future.done()]:
+                del jobs[thumbnail_filename]
+            for index, row, key, status, row_hash, image_hash, full_file_path in pending:
+                if image_hash is None:
+                    continue
+                # Thumbnails already in the store are picked up by create_note without a job,
+                # and rows sharing a source share a single job for all its missing profiles
+                names = self.thumbnail_store.names(full_file_path, image_hash)
+                outputs = [(os.path.join(self.thumbnails_dir, names[profile.name]), profile)
+                           for profile in self.thumbnail_store.profiles]
+                missing = [(path, profile) for path, profile in outputs if not os.path.exists(path)]
+                # Only PDFs with no cached text need reading for it; that rides on the thumbnail job
+                text_path = None
+                if is_pdf(full_file_path) and not os.path.exists(self.text_cache.path(image_hash)):
+                    text_path = self.text_cache.path(image_hash)
+                if image_hash not in jobs and (missing or text_path):
+                    self.thumbnail_store.reused += len(outputs) - len(missing)
+                    if text_path:
+                        self.text_cache.extracted += 1
+                    jobs[image_hash] = self.executor.submit(thumbnail_job, full_file_path, missing, text_path,
+                                                            self.max_decode_bytes)
+                if image_hash in jobs:
+                    self.thumbnail_futures[index] = jobs[image_hash]
+        return pending
+
+    def render(self, item):
+        index, row, key, status, row_hash, image_hash, full_file_path = item
+        start = time.perf_counter()
+        try:
+            result = create_note(row, self.articles_dir, self.thumbnails_dir, self.images_dir,
+                                 thumbnail_future=self.thumbnail_futures.pop(index, None),
+                                 thumbnail_store=self.thumbnail_store, image_hash=image_hash,
+                                 template=self.template, writer=self.writer, image_index=self.image_index,
+                                 text_cache=self.text_cache, max_decode_bytes=self.max_decode_bytes)
+            if result and result['success']:
+                self.notes_created += 1
+                self.row_counts[status] += 1
+                if result['thumbnail_failed']:
+                    # Left out of the manifest so the next run tries the scan again
+                    self.thumbnails_failed += 1
+                    self.manifest.forget(key)
+                else:
+                    self.manifest.record(key, row_hash, image_hash, result['thumbnails'])
+                self.add_record(index, row, row_hash, image_hash, result['thumbnails'])
+                if result['thumbnail_created']:
+                    self.thumbnails_created += 1
+            else:
+                logging.warning(
+                    f"Failed to create note for row {index + 1}. Article: {row.get('Article', 'Unknown')}")
+        except Exception as e:
+            logging.error(
+                f"Error processing row {index + 1}. Article: {row.get('Article', 'Unknown')}. Error: {str(e)}")
+            logging.debug(traceback.format_exc())
+        self.render_time += time.perf_counter() - start
+
+    def add_record(self, index, row, row_hash, image_hash, thumbnails):
+        if self.records_db is None:
+            return
+        filepath = os.path.join(self.articles_dir, row['note_filename'])
+        # The row number is stored too, so rows inserted or deleted above this one update it
+        hash_value = record_hash(row_hash, image_hash, index)
+        if not self.records_db.needs(filepath, hash_value):
+            return
+        smallest = self.thumbnail_store.profiles[0].name
+        thumbnail = f"thumbnails/{thumbnails[smallest]}" if thumbnails and smallest in thumbnails else None
+        text = None
+        if image_hash is not None:
+            # Only PDFs have cached text
+            cached = self.text_cache.load(image_hash)
+            text = '\n'.join(cached['text']) if cached else None
+        self.records_db.add(filepath, hash_value, src=row['Src'], date=format_value(row['Date']) or None,
+                            year=int(row['year']) if isinstance(row['year'], str) else None,
+                            article=format_value(row['Article']),
+                            themes=joined(row, THEME_COLUMNS), names=joined(row, NAME_COLUMNS),
+                            places=joined(row, PLACE_COLUMNS), thumbnail=thumbnail, text=text,
+                            excel_row=index + 2)
+
+    def finish(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+        write_summary = {}
+        if self.writer is not None:
+            write_summary = self.writer.close()
+            # Notes that never reached the disk must be retried on the next run
+            for filepath in self.writer.failed:
+                self.manifest.forget(os.path.basename(filepath))
+                if self.records_db is not None:
+                    self.records_db.forget(filepath)
+
+        index_summary = self.index.write() if self.index is not None else {}
+        records_summary = self.records_db.finish(self.sources) if self.records_db is not None else {}
+
+        removed = self.manifest.prune(self.seen_keys)
+        # Rewriting the large JSON files is skipped when nothing in them changed
+        if self.manifest.dirty or not os.path.exists(self.manifest.path):
+            self.manifest.save()
+        for key in removed:
+            logging.info(f"Row no longer in workbook: {key}")
+            # Long titles used to be cut leaving a trailing space; that note is now
+            # written without it, so the old copy goes
+            if key.endswith(' .md') and key[:-4] + '.md' in self.seen_keys:
+                try:
+                    os.remove(os.path.join(self.articles_dir, key))
+                    logging.info(f"Removed note under its old name: {key}")
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logging.error(f"Error removing note {key}: {str(e)}")
+        unreferenced = self.image_index.unreferenced() if self.image_index is not None else []
+        for name in unreferenced:
+            logging.info(f"Image not referenced by any row: {name}")
+
+        thumbnail_summary = {}
+        for profile, total in self.thumbnail_store.profile_bytes().items():
+            label = f"{profile.name}, {profile.size[0]}x{profile.size[1]} {profile.fmt}"
+            thumbnail_summary[f"Thumbnail bytes ({label})"] = total
+        thumbnail_bytes = sum(thumbnail_summary.values())
+        thumbnail_summary['Thumbnail bytes (all profiles)'] = thumbnail_bytes
+        if self.thumbnail_budget is not None and thumbnail_bytes > self.thumbnail_budget:
+            logging.warning(f"Thumbnails use {thumbnail_bytes} bytes, over the budget of {self.thumbnail_budget}")
+            print(f"Warning: thumbnails use {thumbnail_bytes / 1e6:.2f} MB, "
+                  f"over the budget of {self.thumbnail_budget / 1e6:.2f} MB")
+
+        return {
+            'Processed records': self.records,
+            'Notes created': self.notes_created,
+            'Thumbnails created': self.thumbnails_created,
+            'Thumbnails failed (unreadable or oversized scans)': self.thumbnails_failed,
+            'Thumbnails reused from store': self.thumbnail_store.reused,
+            'Rows new': self.row_counts['new'],
+            'Rows changed': self.row_counts['changed'],
+            'Rows unchanged': self.row_counts['unchanged'],
+            'Rows removed': len(removed),
+            'Rows with an invalid Date': self.invalid_dates,
+            'Images not referenced by any row': len(unreferenced),
+            **thumbnail_summary,
+            'PDF transcripts extracted': self.text_cache.extracted,
+            'PDF transcripts reused from cache': self.text_cache.reused,
+            'Render time, incl. inline thumbnails (s)': round(self.render_time, 3),
+            **index_summary,
+            **records_summary,
+            **write_summary,
+        }
+
+
+def add_thumbnail_options(parser):
+    parser.add_argument('--thumbnail-profiles', type=parse_profiles, default=DEFAULT_PROFILES,
+                        help="Comma-separated name:WxH:FORMAT[:quality][:gray] thumbnail sizes, e.g. "
+                             "small:160x160:webp:60:gray,large:800x800:jpeg:80 (default small:300x300:jpeg:75)")
+    parser.add_argument('--thumbnail-budget', type=float,
+                        help="Warn when the vault's thumbnails exceed this many megabytes")
+    parser.add_argument('--max-decode-mb', type=float, default=DEFAULT_MAX_DECODE_MB,
+                        help="Skip image scans that need more than this many megabytes to decode (0 = no limit, "
+                             f"default {DEFAULT_MAX_DECODE_MB})")
+
+
+def thumbnail_budget(args):
+    return int(args.thumbnail_budget * 1e6) if args.thumbnail_budget is not None else None
+
+
+def max_decode_bytes(args):
+    return int(args.max_decode_mb * 1e6)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import newspaper articles from the project workbook into Obsidian")
+    parser.add_argument('--input', default=r"G:/Projects/Clwyd Hall/_Resources/Clwyd Hall Project.xlsm")
+    parser.add_argument('--output', default=r"G:/Projects/Obsidian/Vaultez/Newspapers")
+    parser.add_argument('--full', action='store_true',
+                        help="Regenerate every note, ignoring the import manifest")
+    parser.add_argument('--template', help="Markdown note template file (defaults to the built-in TEMPLATE)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help="Folder for cached snapshots of the parsed sheet")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the workbook")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes for thumbnail generation (1 = serial)")
+    parser.add_argument('--writer-threads', type=int, default=4,
+                        help="Number of threads writing notes behind rendering (0 = write inline)")
+    parser.add_argument('--no-index', action='store_true',
+                        help="Do not build the Index/People, Places and Themes hub notes")
+    add_thumbnail_options(parser)
+    add_records_options(parser)
+    add_stream_options(parser)
+    add_run_options(parser, 'newspaper_import_report.json')
+    args = parser.parse_args(argv)
+
+    setup_logging('newspaper_import_log.txt', args.log_level)
+    input_file = args.input
+    template = NoteTemplate.from_file(args.template) if args.template else NOTE_TEMPLATE
+    sheet_name = "Newspapers"
+    records = None
+
+    try:
+        records = open_records(args, args.output)
+        importer = NewspaperImporter(args.output, template, full=args.full, workers=args.workers,
+                                     writer_threads=args.writer_threads, index=not args.no_index,
+                                     thumbnail_profiles=args.thumbnail_profiles,
+                                     thumbnail_budget=thumbnail_budget(args), records=records,
+                                     max_decode_bytes=max_decode_bytes(args))
+
+        if args.stream:
+            logging.info(f"Streaming Excel file: {input_file}")
+            summaries = stream_importers(input_file, sheet_name, [importer], args.chunk_size)
+        else:
+            logging.info(f"Reading Excel file: {input_file}")
+            df = read_sheet(input_file, sheet_name, None if args.no_cache else args.cache_dir)
+            logging.info(f"Successfully read {len(df)} records from Excel")
 
-        print(f"\nProcessed {len(df_filtered)} records")
-        print(f"Notes created: {notes_created}")
-        print(f"Thumbnails created: {thumbnails_created}")
+            print("Columns in the DataFrame:")
+            print(df.columns)
 
-        logging.info(f"Processed {len(df_filtered)} records")
-        logging.info(f"Notes created: {notes_created}")
-        logging.info(f"Thumbnails created: {thumbnails_created}")
+            summaries = run_importers(df, [importer])
+        timer.write_report(args.report, input=input_file, summaries=dict(summaries))
 
     except Exception as e:
         logging.error(f"Error processing Excel file: {str(e)}")
         logging.debug(traceback.format_exc())
+    finally:
+        if records is not None:
+            records.close()
 
 
 if __name__ == "__main__":
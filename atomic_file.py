@@ -0,0 +1,43 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+# State files, caches and reports are replaced in one rename, so a run that dies
+# half-way (or a reader that looks at the wrong moment) never sees a partial file
+
+
+@contextmanager
+def replacing(path):
+    # Yields a temporary path next to path; what the block writes there replaces path
+    # when it succeeds and is removed when it fails. The process id keeps worker
+    # processes writing the same file from sharing a temporary.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_json(path, data, **options):
+    # Small, diffable output unless the caller asks otherwise
+    options = {'indent': 1, 'sort_keys': True, **options}
+    with replacing(path) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **options)
+
+
+def load_json(path, default=None):
+    # default ({} if not given) when the file is missing; an unreadable file is logged
+    # and treated as missing, so the caller rebuilds what it described
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable {path}: {str(e)}")
+    return {} if default is None else default
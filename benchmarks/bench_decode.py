@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from PIL import Image, ImageChops  # noqa: E402
+
+import synthetic  # noqa: E402
+from bench_import import peak_rss_mb  # noqa: E402
+from raster_decode import DEFAULT_MAX_DECODE_MB  # noqa: E402
+
+# Large single-page scans in the formats the Images folders hold. Each is made into a
+# thumbnail by the current render_thumbnail and by the decode the importer used before
+# raster_decode, in a fresh interpreter so peak RSS belongs to that one decode.
+
+
+def gray16(img):
+    # 16-bit greyscale, as some archive scanners deliver
+    return img.convert('L').point(lambda value: value * 256, 'I').convert('I;16')
+
+
+# kind: (extension, conversion of the RGB page, format, save parameters)
+SCANS = {
+    'jpeg-rgb': ('.jpg', None, 'JPEG', {'quality': 85}),
+    'tiff-gray-lzw': ('.tif', lambda img: img.convert('L'), 'TIFF', {'compression': 'tiff_lzw'}),
+    'tiff-bilevel-g4': ('.tif', lambda img: img.convert('1'), 'TIFF', {'compression': 'group4'}),
+    'tiff-gray16': ('.tif', gray16, 'TIFF', {}),
+    'png-palette': ('.png', lambda img: img.convert('P', palette=Image.Palette.ADAPTIVE), 'PNG', {}),
+    'png-rgba': ('.png', lambda img: img.convert('RGBA'), 'PNG', {}),
+}
+DECODERS = ['before', 'after']
+
+
+def scan_path(data_dir, kind):
+    return os.path.join(data_dir, kind + SCANS[kind][0])
+
+
+def make_scans(data_dir, size):
+    os.makedirs(data_dir, exist_ok=True)
+    # Paper grain, so the files compress about as badly as real scans do
+    grain = Image.effect_noise(size, 40).convert('RGB')
+    page = ImageChops.blend(synthetic.newsprint(size), grain, 0.2)
+    del grain
+    for kind, (extension, convert, fmt, params) in SCANS.items():
+        path = scan_path(data_dir, kind)
+        if not os.path.exists(path):
+            (convert(page) if convert else page).save(path, fmt, **params)
+
+
+def decode_before(file_path, outputs, box):
+    # The raster branch of render_thumbnail before raster_decode
+    import Obsidian_newspaper_import_v15 as newspaper
+
+    # With Pillow's own decompression-bomb limit, which raster_decode only lifts while it decodes
+    with Image.open(file_path) as img:
+        if img.mode in ('P', 'RGBA', 'LA'):
+            img = img.convert('RGB')
+        img.thumbnail(box)
+        newspaper.save_thumbnails(img, outputs)
+
+
+def run_case(kind, decoder, data_dir, max_decode_mb):
+    # Runs inside a fresh interpreter
+    import Obsidian_newspaper_import_v15 as newspaper
+    from thumbnail_store import DEFAULT_PROFILES
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        outputs = [(os.path.join(work_dir, f"{profile.name}.jpg"), profile) for profile in DEFAULT_PROFILES]
+        box = DEFAULT_PROFILES[-1].size
+        baseline = peak_rss_mb()
+        error = None
+        start = time.perf_counter()
+        try:
+            if decoder == 'before':
+                decode_before(scan_path(data_dir, kind), outputs, box)
+            else:
+                newspaper.render_thumbnail(scan_path(data_dir, kind), outputs,
+                                           max_decode_bytes=int(max_decode_mb * 1e6))
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+        seconds = time.perf_counter() - start
+    return {'case': kind, 'decoder': decoder, 'seconds': round(seconds, 3),
+            'peak_rss_mb': round(peak_rss_mb(), 1), 'baseline_rss_mb': round(baseline, 1), 'error': error}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark thumbnail decoding of large image scans")
+    parser.add_argument('--data', help="Folder of generated scans (default: vaultez-decode-bench in the temp folder)")
+    # A3 at 600 dpi
+    parser.add_argument('--size', default='7016x9921')
+    parser.add_argument('--case', action='append', choices=list(SCANS), help="Run only these scans (may be repeated)")
+    parser.add_argument('--max-decode-mb', type=float, default=DEFAULT_MAX_DECODE_MB)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the fastest is reported")
+    parser.add_argument('--results', default='bench_results.jsonl',
+                        help="JSON Lines file the results are appended to")
+    parser.add_argument('--run-case', nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument('--make-scans', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.abspath(args.data or os.path.join(tempfile.gettempdir(), 'vaultez-decode-bench', args.size))
+    if args.run_case:
+        print(json.dumps(run_case(*args.run_case, data_dir, args.max_decode_mb)))
+        return
+    if args.make_scans:
+        make_scans(data_dir, tuple(int(v) for v in args.size.split('x')))
+        return
+
+    # Generated in a child process: peak RSS carries over into processes started from
+    # this one, so this one has to stay small
+    if not all(os.path.exists(scan_path(data_dir, kind)) for kind in SCANS):
+        print(f"Generating {args.size} scans in {data_dir}")
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--data', data_dir, '--size', args.size,
+                        '--make-scans'], check=True)
+
+    print(f"{'case':<18}{'decoder':>8}{'MB on disk':>12}{'seconds':>10}{'peak MB':>10}{'decode MB':>11}  error")
+    with open(args.results, 'a', encoding='utf-8') as out:
+        for kind in args.case or SCANS:
+            for decoder in DECODERS:
+                results = []
+                for _ in range(args.repeat):
+                    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--data', data_dir,
+                                                '--max-decode-mb', str(args.max_decode_mb),
+                                                '--run-case', kind, decoder], capture_output=True, text=True)
+                    if completed.returncode != 0:
+                        print(f"{kind:<18}{decoder:>8} failed:\n{completed.stderr}")
+                        break
+                    results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+                if not results:
+                    continue
+                result = min(results, key=lambda r: r['seconds'])
+                result['peak_rss_mb'] = max(r['peak_rss_mb'] for r in results)
+                result['size'] = args.size
+                disk_mb = os.path.getsize(scan_path(data_dir, kind)) / 1e6
+                # decode MB: peak RSS above what the interpreter and imports already used
+                print(f"{kind:<18}{decoder:>8}{disk_mb:>12.1f}{result['seconds']:>10.3f}{result['peak_rss_mb']:>10.1f}"
+                      f"{result['peak_rss_mb'] - result['baseline_rss_mb']:>11.1f}  {result['error'] or ''}")
+                out.write(json.dumps(result) + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import ctypes
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import pandas as pd  # noqa: E402
+
+import synthetic  # noqa: E402
+
+CASES = ['create_note:newspaper', 'create_note:census'] + \
+        [f"create_thumbnail:{kind}" for kind in synthetic.IMAGE_KINDS] + \
+        ['main:newspaper', 'main:census']
+
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far
+    if sys.platform == 'win32':
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', ctypes.c_ulong), ('PageFaultCount', ctypes.c_ulong),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t), ('PagefileUsage', ctypes.c_size_t),
+                        ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def dataset_rows(data_dir, sources):
+    df = pd.read_excel(os.path.join(data_dir, 'workbook.xlsx'), sheet_name='Newspapers', engine='openpyxl')
+    return df[df['Src'].isin(sources)]
+
+
+def bench_create_note_newspaper(data_dir, work_dir):
+    import Obsidian_newspaper_import_v15 as newspaper
+    from row_prep import prepare_rows
+
+    df = prepare_rows(dataset_rows(data_dir, newspaper.NewspaperImporter.sources))
+    records = df.to_dict('records')
+    articles_dir = os.path.join(work_dir, 'Articles')
+    os.makedirs(articles_dir)
+    # No Images folder, so this measures note rendering and writing only
+    images_dir = os.path.join(work_dir, 'no-images')
+    start = time.perf_counter()
+    for row in records:
+        newspaper.create_note(row, articles_dir, work_dir, images_dir)
+    seconds = time.perf_counter() - start
+    check_notes_written(articles_dir, [row['note_filename'] for row in records])
+    return len(records), seconds
+
+
+def check_notes_written(articles_dir, filenames):
+    # Long titles give note names right at the 255-character limit; a run that cannot
+    # write them is not a valid measurement
+    missing = [name for name in filenames if not os.path.exists(os.path.join(articles_dir, name))]
+    if missing:
+        longest = max(len(name) for name in missing)
+        raise RuntimeError(f"{len(missing)} notes were not written (longest name {longest} characters)")
+
+
+def bench_create_note_census(data_dir, work_dir):
+    import Obsidian_census_import as census
+
+    records = dataset_rows(data_dir, census.CensusImporter.sources).to_dict('records')
+    start = time.perf_counter()
+    for row in records:
+        census.create_note(row, work_dir)
+    return len(records), time.perf_counter() - start
+
+
+def bench_create_thumbnail(data_dir, work_dir, kind):
+    import Obsidian_newspaper_import_v15 as newspaper
+
+    images_dir = os.path.join(data_dir, 'vault', 'Newspapers', 'Images')
+    # Scans of each kind are numbered so that scan number modulo the kind count picks the kind
+    index = synthetic.IMAGE_KINDS.index(kind)
+    files = sorted(name for name in os.listdir(images_dir)
+                   if int(os.path.splitext(name)[0].rsplit('_', 1)[-1]) % len(synthetic.IMAGE_KINDS) == index)
+    start = time.perf_counter()
+    for name in files:
+        newspaper.create_thumbnail(os.path.join(images_dir, name), work_dir)
+    return len(files), time.perf_counter() - start
+
+
+def bench_main(data_dir, work_dir, which):
+    workbook = os.path.join(data_dir, 'workbook.xlsx')
+    report = os.path.join(work_dir, 'report.json')
+    if which == 'newspaper':
+        import Obsidian_newspaper_import_v15 as newspaper
+        # A fresh vault holding only the scans, so every run does the same work: nothing an
+        # earlier run left behind (notes, thumbnails, manifests, the PDF text cache, index
+        # notes, the records database) is there to be reused
+        output_dir = os.path.join(work_dir, 'vault', 'Newspapers')
+        shutil.copytree(os.path.join(data_dir, 'vault', 'Newspapers', 'Images'), os.path.join(output_dir, 'Images'))
+        rows = len(dataset_rows(data_dir, newspaper.NewspaperImporter.sources))
+        argv = ['--input', workbook, '--output', output_dir, '--no-cache', '--report', report]
+        main = newspaper.main
+    else:
+        import Obsidian_census_import as census
+        rows = len(dataset_rows(data_dir, census.CensusImporter.sources))
+        argv = ['--input', workbook, '--output', os.path.join(work_dir, 'Census'), '--no-cache', '--report', report]
+        main = census.main
+
+    start = time.perf_counter()
+    main(argv)
+    seconds = time.perf_counter() - start
+    with open(report, 'r', encoding='utf-8') as f:
+        summaries = json.load(f).get('summaries', {})
+    failed = sum(summary.get('Note writes failed', 0) for summary in summaries.values())
+    if failed:
+        raise RuntimeError(f"{failed} note writes failed")
+    return rows, seconds
+
+
+def run_case(case, data_dir):
+    # Runs inside a fresh interpreter so peak RSS belongs to this case alone
+    kind, _, which = case.partition(':')
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        if kind == 'create_note':
+            bench = bench_create_note_newspaper if which == 'newspaper' else bench_create_note_census
+            rows, seconds = bench(data_dir, work_dir)
+        elif kind == 'create_thumbnail':
+            rows, seconds = bench_create_thumbnail(data_dir, work_dir, which)
+        else:
+            rows, seconds = bench_main(data_dir, work_dir, which)
+        os.chdir(BENCH_DIR)
+    return {
+        'case': case,
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_s': round(rows / seconds, 1) if seconds else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the import pipeline on synthetic data")
+    parser.add_argument('--data', help="Dataset folder (generated if missing or with --regenerate)")
+    parser.add_argument('--regenerate', action='store_true')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--src-mix', type=synthetic.parse_src_mix, default=synthetic.DEFAULT_SRC_MIX)
+    parser.add_argument('--nan-density', type=float, default=0.2)
+    parser.add_argument('--long-titles', type=float, default=0.05)
+    parser.add_argument('--image-size', default='1600x2400')
+    parser.add_argument('--image-pool', type=int, default=40,
+                        help="Number of distinct scans shared by all rows")
+    parser.add_argument('--case', action='append', choices=CASES, help="Run only these cases (may be repeated)")
+    parser.add_argument('--results', default='bench_results.jsonl',
+                        help="JSON Lines file the results are appended to")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.abspath(args.data or os.path.join(tempfile.gettempdir(), 'vaultez-bench'))
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, data_dir)))
+        return
+
+    if args.regenerate or not os.path.exists(os.path.join(data_dir, 'workbook.xlsx')):
+        width, height = (int(v) for v in args.image_size.split('x'))
+        print(f"Generating {args.rows} synthetic rows in {data_dir}")
+        synthetic.make_dataset(data_dir, args.rows, args.src_mix, args.nan_density, args.long_titles,
+                               image_size=(width, height), image_pool=args.image_pool)
+
+    params = {'rows': args.rows, 'src_mix': args.src_mix, 'nan_density': args.nan_density,
+              'long_titles': args.long_titles, 'image_size': args.image_size, 'image_pool': args.image_pool}
+    meta = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'revision': git_revision(),
+            'python': sys.version.split()[0], 'platform': sys.platform, 'params': params}
+
+    print(f"{'case':<28}{'rows':>8}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}")
+    with open(args.results, 'a', encoding='utf-8') as out:
+        for case in args.case or CASES:
+            completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--data', data_dir,
+                                        '--run-case', case], capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"{case:<28} failed:\n{completed.stderr}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{case:<28}{result['rows']:>8}{result['seconds']:>10.3f}{result['rows_per_s'] or 0:>12,.1f}"
+                  f"{result['peak_rss_mb']:>10.1f}")
+            out.write(json.dumps({**meta, **result}) + '\n')
+
+
+if __name__ == "__main__":
+    main()
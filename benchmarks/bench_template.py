@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Obsidian_newspaper_import_v15 import TEMPLATE as NEWSPAPER_TEMPLATE  # noqa: E402
+from Obsidian_census_import import TEMPLATE as CENSUS_TEMPLATE  # noqa: E402
+from note_template import NoteTemplate  # noqa: E402
+
+COLUMNS = ['Src', 'Date', 'Article', 'T', 'Theme_2', 'Theme_3', 'Theme_4', 'Theme_5', 'Name_1', 'Name_2',
+           'Place_1', 'Place_2', 'Fmt', 'Transcribed', 'Newspaper_or_Source', 'Published', 'Address', 'Web',
+           'Full_Filename']
+
+
+def make_rows(count):
+    rows = []
+    for i in range(count):
+        row = {column: f"{column} value {i}" for column in COLUMNS}
+        # Leave a few cells empty, as in the real sheet
+        row['Theme_4'] = float('nan')
+        row['Theme_5'] = None
+        rows.append(row)
+    return rows
+
+
+def render_replace(template, row):
+    # The per-column str.replace loop the importers used before NoteTemplate
+    content = template
+    for key, value in row.items():
+        content = content.replace(f"{{{{{key}}}}}", str(value) if pd.notna(value) else "")
+    return content
+
+
+def bench(label, render, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for row in rows:
+            render(row)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {len(rows) / best:>12,.0f} rows/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark note template rendering throughput")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+    for name, text in [('newspaper', NEWSPAPER_TEMPLATE), ('census', CENSUS_TEMPLATE)]:
+        template = NoteTemplate(text)
+        bench(f"{name} str.replace loop", lambda row: render_replace(text, row), rows, args.repeat)
+        bench(f"{name} NoteTemplate", template.render, rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
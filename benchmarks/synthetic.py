@@ -0,0 +1,156 @@
+import argparse
+import io
+import os
+import random
+
+import fitz  # PyMuPDF
+import pandas as pd
+from PIL import Image, ImageDraw
+
+# Synthetic stand-ins for the project workbook and the Images folder, so import
+# throughput can be measured without the private data
+
+DEFAULT_SRC_MIX = {'NC': 0.35, 'BN': 0.25, 'WN': 0.2, 'CEN': 0.2}
+IMAGE_KINDS = ['jpeg', 'png', 'rgba', 'pdf']
+EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'rgba': '.png', 'pdf': '.pdf'}
+
+THEMES = ['Local News', 'Church', 'Estate', 'Court', 'Agriculture', 'School', 'Obituary', 'Sale']
+NAMES = ['John Jones', 'Mary Davies', 'Thomas Williams', 'Ellen Roberts', 'Robert Hughes', 'Jane Evans']
+PLACES = ['Llanychan', 'Ruthin', 'Denbigh', 'Llandyrnog', 'Clwyd Hall', 'Mold']
+NEWSPAPERS = ['Rhyl Journal', 'Denbighshire Free Press', 'Wrexham Advertiser', 'North Wales Chronicle']
+WORDS = ['sale', 'of', 'the', 'estate', 'at', 'meeting', 'vestry', 'parish', 'fire', 'harvest', 'court',
+         'petty', 'sessions', 'concert', 'in', 'aid', 'school', 'funeral', 'late', 'Mr']
+
+
+def parse_src_mix(text):
+    # "NC=0.4,BN=0.3,WN=0.1,CEN=0.2" -> dict of weights
+    mix = {}
+    for part in text.split(','):
+        src, weight = part.split('=')
+        mix[src.strip()] = float(weight)
+    return mix
+
+
+def make_title(rng, index, long_title):
+    words = rng.choices(WORDS, k=rng.randint(60, 90) if long_title else rng.randint(4, 10))
+    # A few characters clean_filename has to strip
+    return f"{' '.join(words).capitalize()}: no. {index}?"
+
+
+def make_rows(count, src_mix=None, nan_density=0.2, long_titles=0.05, image_kinds=None, image_pool=None, seed=1):
+    rng = random.Random(seed)
+    src_mix = src_mix or DEFAULT_SRC_MIX
+    image_kinds = image_kinds or IMAGE_KINDS
+    sources = rng.choices(list(src_mix), weights=list(src_mix.values()), k=count)
+
+    def maybe(value):
+        return None if rng.random() < nan_density else value
+
+    rows = []
+    for i, src in enumerate(sources):
+        # With an image pool, rows reuse a fixed set of scans (as duplicated clippings do)
+        scan = i % image_pool if image_pool else i
+        kind = image_kinds[scan % len(image_kinds)]
+        year = rng.randint(1750, 1950)
+        rows.append({
+            'Src': src,
+            'Date': f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'Article': make_title(rng, i, rng.random() < long_titles),
+            'T': rng.choice(THEMES),
+            'Theme_2': maybe(rng.choice(THEMES)),
+            'Theme_3': maybe(rng.choice(THEMES)),
+            'Theme_4': None if rng.random() < 0.8 else rng.choice(THEMES),
+            'Theme_5': None if rng.random() < 0.9 else rng.choice(THEMES),
+            'Name_1': maybe(rng.choice(NAMES)),
+            'Name_2': maybe(rng.choice(NAMES)),
+            'Place_1': maybe(rng.choice(PLACES)),
+            'Place_2': maybe(rng.choice(PLACES)),
+            'Fmt': 'pdf' if kind == 'pdf' else 'img',
+            'Transcribed': maybe(rng.choice(['Y', 'N'])),
+            'Newspaper_or_Source': maybe(rng.choice(NEWSPAPERS)),
+            'Published': maybe(str(year)),
+            'Address': maybe(f"https://newspapers.library.wales/view/{rng.randint(1000000, 9999999)}"),
+            'Web': maybe(f"https://example.org/census/{i}"),
+            # Workbook paths are Windows paths; the importers keep only the file name
+            'Full_Filename': f"G:\\Projects\\_Resources\\Newspapers\\images\\scan_{scan:06d}{EXTENSIONS[kind]}",
+        })
+    return rows
+
+
+def newsprint(size, mode='RGB', seed=0):
+    rng = random.Random(seed)
+    img = Image.new(mode, size, (236, 228, 210) if mode == 'RGB' else (236, 228, 210, 255))
+    draw = ImageDraw.Draw(img)
+    # Newsprint-like columns of dark bars so encoders have some detail to work on
+    for x in range(40, size[0] - 40, size[0] // 5):
+        for y in range(60, size[1] - 40, 18):
+            width = rng.randint(size[0] // 10, size[0] // 6)
+            draw.rectangle([x, y, x + width, y + 8], fill=(40, 40, 40) if mode == 'RGB' else (40, 40, 40, 255))
+    return img
+
+
+def make_image(path, kind, size=(1600, 2400), pages=4, seed=0):
+    img = newsprint(size, 'RGBA' if kind == 'rgba' else 'RGB', seed)
+
+    if kind == 'jpeg':
+        img.save(path, 'JPEG', quality=85)
+    elif kind in ('png', 'rgba'):
+        img.save(path, 'PNG')
+    else:
+        buffer = io.BytesIO()
+        img.convert('RGB').save(buffer, 'JPEG', quality=80)
+        with fitz.open() as doc:
+            for _ in range(pages):
+                page = doc.new_page(width=1296, height=1656)  # broadsheet, 18 x 23 inches
+                page.insert_image(page.rect, stream=buffer.getvalue())
+                page.insert_text((72, 72), "Synthetic transcription text for the benchmark", fontsize=14)
+            doc.save(path)
+
+
+def make_dataset(root, rows=1000, src_mix=None, nan_density=0.2, long_titles=0.05, image_kinds=None,
+                 image_size=(1600, 2400), images=True, image_pool=None, seed=1):
+    # Writes <root>/workbook.xlsx (sheet "Newspapers") and the matching scans under
+    # <root>/vault/Newspapers/Images, laid out like the real vault
+    images_dir = os.path.join(root, 'vault', 'Newspapers', 'Images')
+    os.makedirs(images_dir, exist_ok=True)
+    image_kinds = image_kinds or IMAGE_KINDS
+    records = make_rows(rows, src_mix, nan_density, long_titles, image_kinds, image_pool, seed)
+
+    if images:
+        for record in records:
+            name = record['Full_Filename'].rsplit('\\', 1)[-1]
+            path = os.path.join(images_dir, name)
+            if not os.path.exists(path):
+                # The scan number picks the kind, as in make_rows
+                scan = int(os.path.splitext(name)[0].rsplit('_', 1)[-1])
+                make_image(path, image_kinds[scan % len(image_kinds)], image_size, seed=scan)
+
+    workbook = os.path.join(root, 'workbook.xlsx')
+    pd.DataFrame(records).to_excel(workbook, sheet_name='Newspapers', index=False, engine='openpyxl')
+    return workbook, images_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic workbook and Images folder")
+    parser.add_argument('root')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--src-mix', type=parse_src_mix, default=DEFAULT_SRC_MIX,
+                        help="Src weights, e.g. NC=0.4,BN=0.3,WN=0.1,CEN=0.2")
+    parser.add_argument('--nan-density', type=float, default=0.2)
+    parser.add_argument('--long-titles', type=float, default=0.05, help="Fraction of very long Article titles")
+    parser.add_argument('--image-kinds', default=','.join(IMAGE_KINDS))
+    parser.add_argument('--image-size', default='1600x2400')
+    parser.add_argument('--image-pool', type=int, help="Number of distinct scans shared by all rows")
+    parser.add_argument('--no-images', action='store_true')
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.image_size.split('x'))
+    workbook, images_dir = make_dataset(args.root, args.rows, args.src_mix, args.nan_density, args.long_titles,
+                                        args.image_kinds.split(','), (width, height), not args.no_images,
+                                        args.image_pool)
+    print(f"Workbook: {workbook}")
+    print(f"Images:   {images_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import csv
+import logging
+import os
+import re
+import shutil
+import traceback
+
+from import_manifest import ImportManifest
+from import_pipeline import setup_logging
+from note_writer import write_note
+from Obsidian_newspaper_import_v15 import clean_filename
+
+# Links written by create_note: [[Images/<name>|Local File]] and ![[thumbnails/<name>]]
+LINK_RE = re.compile(r'\[\[(Images|thumbnails)/([^\]|]+)')
+
+
+def read_rename_map(path):
+    # Same layout as renameANC.csv: OldName,NewName per line, no header row
+    renames = {}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for line in csv.reader(f):
+            if len(line) < 2 or not line[0].strip():
+                continue
+            renames[os.path.basename(line[0].strip())] = os.path.basename(line[1].strip())
+    return renames
+
+
+def legacy_thumbnail_name(image_name):
+    # Thumbnails from before the content-addressed store were named after the scan
+    return f"thumb_{clean_filename(os.path.splitext(image_name)[0])}.jpg"
+
+
+def rename_files(directory, renames):
+    # One scan of the folder, then renames resolved against it; returns {old: new} done
+    with os.scandir(directory) as it:
+        present = {entry.name.lower(): entry.name for entry in it if entry.is_file()}
+    done = {}
+    for old, new in renames.items():
+        actual = present.get(old.lower())
+        if actual is None:
+            logging.warning(f"File not found: {os.path.join(directory, old)}")
+            continue
+        if new.lower() in present and new.lower() != actual.lower():
+            logging.error(f"Failed to rename {actual}: {new} already exists")
+            continue
+        try:
+            os.rename(os.path.join(directory, actual), os.path.join(directory, new))
+        except OSError as e:
+            logging.error(f"Failed to rename {actual}: {str(e)}")
+            continue
+        del present[actual.lower()]
+        present[new.lower()] = new
+        done[actual] = new
+        logging.info(f"Renamed: {actual} -> {new}")
+    return done
+
+
+def move_cache_entries(cache, images_dir, renamed):
+    # A rename keeps size and mtime, so the cached content hash stays valid under the new path
+    for old, new in renamed.items():
+        entry = cache.pop(os.path.join(images_dir, old), None)
+        if entry is not None:
+            cache[os.path.join(images_dir, new)] = entry
+
+
+def rewrite_links(articles_dir, link_map):
+    # Rewrite [[Images/...]] and [[thumbnails/...]] targets in place, one pass per note
+    def replace(match):
+        target = link_map.get((match.group(1), match.group(2)))
+        return f"[[{match.group(1)}/{target}" if target else match.group(0)
+
+    rewritten = 0
+    with os.scandir(articles_dir) as it:
+        notes = [entry.path for entry in it if entry.is_file() and entry.name.endswith('.md')]
+    for note in notes:
+        try:
+            with open(note, 'r', encoding='utf-8') as f:
+                content = f.read()
+            updated = LINK_RE.sub(replace, content)
+            if updated != content and write_note(note, updated):
+                rewritten += 1
+                logging.info(f"Updated links in note: {note}")
+        except Exception as e:
+            logging.error(f"Error updating links in {note}: {str(e)}")
+            logging.debug(traceback.format_exc())
+    return rewritten
+
+
+def check_workbook(workbook_path, sheet_name):
+    # Raises before anything is renamed if the workbook cannot be updated afterwards
+    import openpyxl
+
+    if not os.access(workbook_path, os.W_OK):
+        raise OSError(f"workbook not found or not writable: {workbook_path}")
+    wb = openpyxl.load_workbook(workbook_path, read_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"no sheet {sheet_name} in {workbook_path}")
+        header = next(wb[sheet_name].iter_rows(max_row=1, values_only=True), ())
+        if 'Full_Filename' not in header:
+            raise ValueError(f"sheet {sheet_name} has no Full_Filename column")
+    finally:
+        wb.close()
+
+
+def update_workbook(workbook_path, sheet_name, renamed):
+    # Point Full_Filename at the new names. openpyxl rewrites the whole file, so a copy
+    # of the original is kept next to it; the workbook must not be open in Excel.
+    import openpyxl
+
+    backup = workbook_path + '.bak'
+    shutil.copy2(workbook_path, backup)
+    keep_vba = workbook_path.lower().endswith('.xlsm')
+    wb = openpyxl.load_workbook(workbook_path, keep_vba=keep_vba)
+    ws = wb[sheet_name]
+    header = [cell.value for cell in ws[1]]
+    column = header.index('Full_Filename') + 1
+    lookup = {old.lower(): new for old, new in renamed.items()}
+    updated = 0
+    for (cell,) in ws.iter_rows(min_row=2, min_col=column, max_col=column):
+        if not isinstance(cell.value, str):
+            continue
+        directory, name = re.match(r'^(.*?)([^\\/]*)$', cell.value).groups()
+        new = lookup.get(name.lower())
+        if new:
+            cell.value = directory + new
+            updated += 1
+    wb.save(workbook_path)
+    logging.info(f"Updated {updated} Full_Filename cells in {workbook_path} (backup: {backup})")
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rename scans and keep thumbnails, notes and the workbook in step")
+    parser.add_argument('rename_map', nargs='?', default='renameANC.csv',
+                        help="CSV of OldName,NewName lines (no header)")
+    parser.add_argument('--output', default=r"G:/Projects/Obsidian/Vaultez/Newspapers",
+                        help="Newspapers folder holding Images, Articles and thumbnails")
+    parser.add_argument('--workbook', default=r"G:/Projects/Clwyd Hall/_Resources/Clwyd Hall Project.xlsm",
+                        help="Workbook whose Full_Filename cells are updated (a .bak copy is kept)")
+    parser.add_argument('--no-workbook', action='store_true',
+                        help="Leave the workbook alone; the next import then sees the old names and drops "
+                             "the renamed scans' links")
+    parser.add_argument('--sheet', default="Newspapers")
+    args = parser.parse_args(argv)
+
+    setup_logging('bulk_rename_log.txt')
+    images_dir = os.path.join(args.output, 'Images')
+    articles_dir = os.path.join(args.output, 'Articles')
+    thumbnails_dir = os.path.join(args.output, 'thumbnails')
+
+    # Everything is checked before the first rename, so a problem cannot leave the
+    # scans renamed but the notes or the workbook still pointing at the old names
+    try:
+        if not os.path.isdir(images_dir):
+            raise FileNotFoundError(f"no Images folder at {images_dir}")
+        if not args.no_workbook:
+            check_workbook(args.workbook, args.sheet)
+        renames = read_rename_map(args.rename_map)
+    except Exception as e:
+        logging.error(f"Nothing renamed: {str(e)}")
+        print(f"Nothing renamed: {str(e)}")
+        return 1
+    if args.no_workbook:
+        message = ("--no-workbook: Full_Filename still holds the old names, so the next import will re-render "
+                   "the renamed rows without their image links until the workbook is updated")
+        logging.warning(message)
+        print(f"Warning: {message}")
+
+    renamed = rename_files(images_dir, renames)
+
+    # Carry the cached content hashes over to the new paths so the next import
+    # neither re-hashes nor re-decodes the renamed scans
+    manifest = ImportManifest.load(args.output)
+    move_cache_entries(manifest.images, images_dir, renamed)
+    manifest.save()
+
+    # Content-addressed thumbnails keep their names; older name-based ones follow the scan
+    link_map = {('Images', clean_filename(old)): clean_filename(new) for old, new in renamed.items()}
+    legacy = {legacy_thumbnail_name(old): legacy_thumbnail_name(new) for old, new in renamed.items()}
+    thumbnails_renamed = rename_files(thumbnails_dir, legacy) if os.path.isdir(thumbnails_dir) else {}
+    link_map.update({('thumbnails', old): new for old, new in thumbnails_renamed.items()})
+
+    notes_updated = rewrite_links(articles_dir, link_map) if os.path.isdir(articles_dir) else 0
+    cells_updated = 0
+    if not args.no_workbook and renamed:
+        try:
+            cells_updated = update_workbook(args.workbook, args.sheet, renamed)
+        except Exception as e:
+            logging.error(f"Error updating {args.workbook}: {str(e)}")
+            print(f"Error updating {args.workbook}, update Full_Filename by hand: {str(e)}")
+
+    lines = [f"Renames requested: {len(renames)}",
+             f"Images renamed: {len(renamed)}",
+             f"Thumbnails renamed: {len(thumbnails_renamed)}",
+             f"Notes updated: {notes_updated}",
+             f"Workbook cells updated: {cells_updated}"]
+    print()
+    for line in lines:
+        print(line)
+        logging.info(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
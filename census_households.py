@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import os
+
+from note_template import NoteTemplate, format_value
+from note_writer import sync_notes
+from row_prep import column
+from run_report import timer
+
+# One note per census household instead of one per person: rows sharing the household
+# key (census year, place and schedule by default) become a single note with a table of
+# members. Households are collected from one groupby over the rows and only the ones
+# whose members changed since the last run are rendered and written.
+
+HOUSEHOLD_TEMPLATE = """---
+household: "{{household_quoted}}"
+{{key_properties}}
+members: {{member_count}}
+---
+
+## Household
+
+{{household}}
+
+## Members
+
+{{member_table}}
+
+## Links
+
+{{links}}
+
+## Tags
+
+#Llanychan #Taber-Project #Census #Household
+"""
+HOUSEHOLD_NOTE_TEMPLATE = NoteTemplate(HOUSEHOLD_TEMPLATE)
+
+# 'year' is the census year taken from Date; every other name is a workbook column
+DEFAULT_HOUSEHOLD_KEY = ['year', 'Place_1', 'Schedule']
+# Columns that are the same for every census row, or that go under Links instead
+NOT_IN_TABLE = {'Src', 'Fmt', 'Web', 'Full_Filename'}
+
+# Member hashes of the household notes written last time, kept in the Households folder
+STATE_FILENAME = '.households.json'
+
+
+def parse_household_key(text):
+    key = [name.strip() for name in text.split(',') if name.strip()]
+    if not key:
+        raise ValueError("household key needs at least one column")
+    return key
+
+
+def add_household_options(parser):
+    parser.add_argument('--households', action='store_true',
+                        help="Write one note per census household, with a table of its members, "
+                             "instead of one note per row")
+    parser.add_argument('--household-key', type=parse_household_key, default=DEFAULT_HOUSEHOLD_KEY,
+                        help="Comma-separated columns that identify a household; 'year' is the census year "
+                             f"from Date (default {','.join(DEFAULT_HOUSEHOLD_KEY)})")
+
+
+def household_filename(key_values):
+    # "1861 Llanychan 12.md"; the same characters are dropped as in census note names
+    parts = [value for value in key_values if value]
+    name = ' '.join(parts) if parts else 'No household key'
+    name = ''.join(c for c in name if c.isalnum() or c in [' ', '-']).strip()
+    return name[:252].rstrip() + '.md'
+
+
+def plain_text(value):
+    return format_value(value).strip()
+
+
+def table_cell(value):
+    return plain_text(value).replace('|', '\\|').replace('\n', '<br>')
+
+
+class HouseholdBuilder:
+    def __init__(self, output_dir, key=None, full=False, template=HOUSEHOLD_NOTE_TEMPLATE):
+        self.key = key or DEFAULT_HOUSEHOLD_KEY
+        self.full = full
+        self.template = template
+        self.households_dir = os.path.join(output_dir, 'Households')
+        self.state_path = os.path.join(self.households_dir, STATE_FILENAME)
+        # tuple of key values -> member rows, in sheet order
+        self.households = {}
+        # note filename -> (key values, member rows) and -> member hash, filled in by write()
+        self.notes = {}
+        self.state = {}
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def add(self, df, years):
+        # One groupby over this batch of rows; with --stream a household may span chunks
+        with timer.stage('households'):
+            keys = [(years if name == 'year' else column(df, name)).astype(object).map(plain_text)
+                    for name in self.key]
+            records = df.to_dict('records')
+            for key_values, positions in df.groupby(keys, sort=False).indices.items():
+                if not isinstance(key_values, tuple):
+                    key_values = (key_values,)
+                self.households.setdefault(key_values, []).extend(records[i] for i in positions)
+
+    def digest(self, key_values, members):
+        # Over the values as they are written, so 12 and 12.0 (or a streamed and a batch
+        # read of the same sheet) hash the same
+        digest = hashlib.sha1(self.template.text.encode('utf-8'))
+        digest.update('\x1f'.join(key_values).encode('utf-8'))
+        for member in members:
+            digest.update(b'\x1d')
+            for name, value in member.items():
+                digest.update(f"\x1f{name}\x1e{plain_text(value)}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def render(self, key_values, members):
+        household = ' '.join(value for value in key_values if value) or 'No household key'
+        key_properties = [f"{name}: {value}" for name, value in zip(self.key, key_values) if value]
+
+        # Every column that has a value for at least one member, in sheet order
+        columns = [name for name in members[0] if name not in NOT_IN_TABLE and name not in self.key
+                   and any(plain_text(member.get(name)) for member in members)]
+        lines = ['| ' + ' | '.join(columns) + ' |', '|' + ' --- |' * len(columns)]
+        for member in members:
+            lines.append('| ' + ' | '.join(table_cell(member.get(name)) for name in columns) + ' |')
+
+        # The members' sources, each listed once
+        links = []
+        for member in members:
+            web = format_value(member.get('Web'))
+            local_file = format_value(member.get('Full_Filename'))
+            for link in [f"- [Online Source]({web})" if web else None,
+                         f"- [[{local_file}|Local File]]" if local_file else None]:
+                if link and link not in links:
+                    links.append(link)
+
+        values = {'household': household, 'household_quoted': household.replace('"', '\\"'),
+                  'key_properties': '\n'.join(key_properties), 'member_count': len(members),
+                  'member_table': '\n'.join(lines) if columns else '', 'links': '\n'.join(links)}
+        return self.template.render(values)
+
+    def write(self):
+        # Households whose members (and key) hash the same as last run, and whose note is
+        # still there, are not rendered at all; households that no longer exist are removed
+        with timer.stage('households'):
+            os.makedirs(self.households_dir, exist_ok=True)
+            # Windows folders are case-insensitive, so keys that only differ in case (or in
+            # dropped characters) share a note
+            filenames = {}
+            for key_values, members in self.households.items():
+                filename = filenames.setdefault(household_filename(key_values).lower(), household_filename(key_values))
+                if filename in self.notes:
+                    logging.warning(f"Households {self.notes[filename][0]} and {key_values} both map to {filename}")
+                    self.notes[filename][1].extend(members)
+                else:
+                    self.notes[filename] = (key_values, list(members))
+
+            notes = ((filename, self.digest(key_values, members),
+                      lambda key_values=key_values, members=members: self.render(key_values, members))
+                     for filename, (key_values, members) in self.notes.items())
+            self.state, counts = sync_notes(self.households_dir, self.state_path, notes, self.full, 'household')
+        self.written += counts['written']
+        self.unchanged += counts['unchanged']
+        self.removed += counts['removed']
+
+        return {
+            'Households': len(self.households),
+            'Household notes written': self.written,
+            'Household notes unchanged': self.unchanged,
+            'Household notes removed': self.removed,
+        }
@@ -0,0 +1,267 @@
+import argparse
+import logging
+import os
+import posixpath
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from import_pipeline import add_run_options, setup_logging
+from run_report import timer
+from sheet_cache import DEFAULT_CACHE_DIR, read_sheet
+from row_prep import note_filenames
+from Obsidian_newspaper_import_v15 import NewspaperImporter, clean_filename
+from Obsidian_census_import import CensusImporter, note_filename as census_note_filename
+
+# Checks a vault without opening it in Obsidian: one walk of the vault builds an
+# in-memory index of every file, then every wiki link in every note is resolved against
+# it the way Obsidian does (case-insensitive, by full path, relative to the note, or by
+# a unique path suffix). Reports broken links in the generated notes, media nobody
+# links to, and names that collide.
+
+# [[target]], [[target|alias]], [[target#heading]], ![[embed]]
+WIKILINK_RE = re.compile(r'(!?)\[\[([^\[\]\n]+?)\]\]')
+
+# Folders whose notes the importers write; links in hand-written notes still count
+# towards media being used, but are not reported as broken
+GENERATED_FOLDERS = ['Newspapers/Articles', 'Newspapers/Index', 'Census']
+MEDIA_FOLDERS = ['Newspapers/Images', 'Newspapers/thumbnails']
+
+
+def link_target(text):
+    # The file part of a link, without alias, heading or block reference
+    return text.split('|', 1)[0].split('#', 1)[0].strip().replace('\\', '/')
+
+
+def loose_name(name):
+    # Names the importers would write the same link for
+    return clean_filename(name).lower()
+
+
+class VaultIndex:
+    def __init__(self, vault_dir):
+        self.vault_dir = vault_dir
+        # lowercased vault path -> vault path, with forward slashes
+        self.files = {}
+        # lowercased file name -> vault paths
+        self.by_name = {}
+        # lowercased folder -> every file in it, including names that only differ in case
+        self.folders = {}
+        with timer.stage('scan'):
+            self.scan()
+
+    def scan(self):
+        # Dot-folders (.obsidian, .trash, caches) and dot-files are not part of the vault
+        pending = ['']
+        while pending:
+            folder = pending.pop()
+            try:
+                with os.scandir(os.path.join(self.vault_dir, folder)) as it:
+                    for entry in it:
+                        if entry.name.startswith('.'):
+                            continue
+                        path = f"{folder}/{entry.name}" if folder else entry.name
+                        if entry.is_dir():
+                            pending.append(path)
+                        elif entry.is_file():
+                            self.files[path.lower()] = path
+                            self.by_name.setdefault(entry.name.lower(), []).append(path)
+                            self.folders.setdefault(folder.lower(), []).append(path)
+            except OSError as e:
+                logging.error(f"Could not list {os.path.join(self.vault_dir, folder)}: {str(e)}")
+
+    def notes(self):
+        return [path for key, path in self.files.items() if key.endswith('.md')]
+
+    def folder(self, folder):
+        # Files directly inside a vault folder
+        return self.folders.get(folder.lower(), [])
+
+    def resolve(self, target, note_folder):
+        # Vault path the link opens, or None. Like Obsidian, the target is also tried as
+        # a note (with .md added), first when it has no extension of its own.
+        candidates = (target, target + '.md') if '.' in posixpath.basename(target) else (target + '.md', target)
+        for candidate in candidates:
+            key = candidate.lower().lstrip('/')
+            if key in self.files:
+                return self.files[key]
+            relative = f"{note_folder}/{key}" if note_folder else key
+            if '..' in relative or './' in relative:
+                relative = posixpath.normpath(relative)
+            if relative in self.files:
+                return self.files[relative]
+            matches = [path for path in self.by_name.get(posixpath.basename(key), [])
+                       if path.lower().endswith('/' + key)]
+            if matches:
+                # Several files fit: Obsidian takes the one with the shortest path
+                return min(matches, key=lambda path: (path.count('/'), path))
+        return None
+
+
+def read_links(vault_dir, notes):
+    # [(note, [(embed, link text), ...]), ...] for a batch of notes
+    results = []
+    for note in notes:
+        try:
+            with open(os.path.join(vault_dir, note), 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except OSError as e:
+            logging.error(f"Could not read {note}: {str(e)}")
+            continue
+        results.append((note, [(embed == '!', text) for embed, text in WIKILINK_RE.findall(content)]))
+    return results
+
+
+def check_links(index, threads=8):
+    # Returns (notes, broken links in generated notes, lowercased vault paths some note links to)
+    generated = tuple(folder.lower() + '/' for folder in GENERATED_FOLDERS)
+    notes = index.notes()
+    linked = set()
+    broken = []
+    # The same targets recur across notes (every hub note links the same articles), so
+    # each (folder, target) pair is resolved once
+    resolved_cache = {}
+    # Reading is the slow part on a synced or network drive, so notes are read in
+    # parallel, in batches to keep the per-task overhead down
+    batches = [notes[i:i + 200] for i in range(0, len(notes), 200)]
+    with timer.stage('links'), ThreadPoolExecutor(max_workers=threads) as executor:
+        for results in executor.map(lambda batch: read_links(index.vault_dir, batch), batches):
+            for note, links in results:
+                note_folder = posixpath.dirname(note.lower())
+                for embed, text in links:
+                    target = link_target(text)
+                    if not target:
+                        # [[#Heading]] points into the note itself
+                        continue
+                    key = (note_folder, target)
+                    if key not in resolved_cache:
+                        resolved_cache[key] = index.resolve(target, note_folder)
+                    resolved = resolved_cache[key]
+                    if resolved is not None:
+                        linked.add(resolved.lower())
+                    elif note.lower().startswith(generated):
+                        broken.append({'note': note, 'link': text, 'embed': embed})
+    return notes, broken, linked
+
+
+def explain_broken(index, broken):
+    # Point out the file on disk the link was meant for, when its name differs only in
+    # what clean_filename changes (spacing, case, dropped characters)
+    by_loose = {}
+    for path in index.files.values():
+        by_loose.setdefault(loose_name(posixpath.basename(path)), []).append(path)
+    for link in broken:
+        candidates = by_loose.get(loose_name(posixpath.basename(link_target(link['link']))), [])
+        if candidates:
+            link['on_disk'] = candidates
+
+
+def name_collisions(index, folders):
+    # Files in one folder that Windows, or the links the importers write, cannot tell apart
+    collisions = []
+    for folder in folders:
+        groups = {}
+        for path in index.folder(folder):
+            groups.setdefault(loose_name(posixpath.basename(path)), []).append(path)
+        collisions += [{'folder': folder, 'files': sorted(paths)} for paths in groups.values() if len(paths) > 1]
+    return collisions
+
+
+def workbook_collisions(workbook, sheet_name, cache_dir):
+    # Rows that write the same note (compared case-insensitively, as on Windows), so
+    # the last one silently overwrites the others
+    df = read_sheet(workbook, sheet_name, cache_dir)
+    collisions = []
+    newspapers = df[df['Src'].isin(NewspaperImporter.sources)]
+    census = df[df['Src'].isin(CensusImporter.sources)]
+    sections = [('Newspapers/Articles', newspapers.index, note_filenames(newspapers['Article'])),
+                ('Census', census.index, [census_note_filename(row) for row in census.to_dict('records')])]
+    for folder, rows, filenames in sections:
+        groups = {}
+        for index, filename in zip(rows, filenames):
+            groups.setdefault(filename.lower(), []).append((index, filename))
+        for members in groups.values():
+            if len(members) > 1:
+                collisions.append({'note': f"{folder}/{members[0][1]}",
+                                   'excel_rows': [index + 2 for index, _ in members]})
+    return collisions
+
+
+def print_section(title, items, describe, limit):
+    print(f"{title}: {len(items)}")
+    for item in items[:limit]:
+        print(f"  {describe(item)}")
+    if len(items) > limit:
+        print(f"  ... and {len(items) - limit} more (see the report)")
+
+
+def describe_broken(link):
+    hint = f" (on disk: {', '.join(link['on_disk'])})" if link.get('on_disk') else ''
+    return f"{link['note']}: {'!' if link['embed'] else ''}[[{link['link']}]]{hint}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the links, media and note names of an imported vault")
+    parser.add_argument('--vault', default=r"G:/Projects/Obsidian/Vaultez")
+    parser.add_argument('--workbook', help="Also report workbook rows that write the same note")
+    parser.add_argument('--sheet', default="Newspapers")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help="Folder for cached snapshots of the parsed sheet")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the workbook")
+    parser.add_argument('--threads', type=int, default=8, help="Threads reading notes")
+    parser.add_argument('--limit', type=int, default=20, help="Problems of each kind printed (all are in the report)")
+    add_run_options(parser, 'check_links_report.json')
+    args = parser.parse_args(argv)
+
+    setup_logging('check_links_log.txt', args.log_level)
+    start = time.perf_counter()
+    try:
+        if not os.path.isdir(args.vault):
+            raise FileNotFoundError(f"no vault folder at {args.vault}")
+        index = VaultIndex(args.vault)
+        notes, broken, linked = check_links(index, args.threads)
+        explain_broken(index, broken)
+        orphaned = [path for folder in MEDIA_FOLDERS for path in sorted(index.folder(folder))
+                    if path.lower() not in linked]
+        collisions = name_collisions(index, MEDIA_FOLDERS + GENERATED_FOLDERS)
+        row_collisions = []
+        if args.workbook:
+            with timer.stage('workbook'):
+                cache_dir = None if args.no_cache else args.cache_dir
+                row_collisions = workbook_collisions(args.workbook, args.sheet, cache_dir)
+    except Exception as e:
+        logging.error(f"Error checking vault {args.vault}: {str(e)}")
+        logging.debug(traceback.format_exc())
+        print(f"Error checking vault {args.vault}: {str(e)}")
+        return 2
+    elapsed = time.perf_counter() - start
+
+    for link in broken:
+        logging.warning(f"Broken link: {describe_broken(link)}")
+    for path in orphaned:
+        logging.info(f"Not linked from any note: {path}")
+    for collision in collisions:
+        logging.warning(f"Files that link the same: {', '.join(collision['files'])}")
+    for collision in row_collisions:
+        logging.warning(f"Rows {collision['excel_rows']} all write {collision['note']}")
+
+    files = sum(len(paths) for paths in index.folders.values())
+    print(f"Checked {len(notes)} notes and {files} files in {elapsed:.2f}s")
+    print_section("Broken links in generated notes", broken, describe_broken, args.limit)
+    print_section("Media not linked from any note", orphaned, str, args.limit)
+    print_section("Files whose names collide", collisions, lambda c: ', '.join(c['files']), args.limit)
+    if args.workbook:
+        print_section("Notes written by more than one row", row_collisions,
+                      lambda c: f"{c['note']} (Excel rows {', '.join(map(str, c['excel_rows']))})", args.limit)
+
+    summary = {'Notes checked': len(notes), 'Files indexed': files, 'Broken links': len(broken),
+               'Orphaned media': len(orphaned), 'Colliding file names': len(collisions),
+               'Notes written by more than one row': len(row_collisions)}
+    timer.write_report(args.report, vault=args.vault, summary=summary, broken_links=broken, orphaned_media=orphaned,
+                       file_collisions=collisions, row_collisions=row_collisions)
+    return 1 if broken or collisions or row_collisions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+import argparse
+from datetime import date
+
+import pandas as pd
+
+# The same rules as the workbook's "Check date as text" formula, applied to the whole
+# column at once: quotes and surrounding spaces are ignored, the year must lie between
+# 1700 and the present, and the day must exist in that month. Unlike the formula,
+# partial dates (YYYY-MM and YYYY) are accepted and keep their precision.
+
+MIN_YEAR = 1700
+
+# A trailing ".0" is only a whole-number year read as a float, so it ends the value
+DATE_RE = (r'^(?P<year>\d{4})(?:\.0|'
+           r'(?:-(?P<month>\d{1,2})(?:-(?P<day>\d{1,2}))?)?'
+           r'(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?)$')
+
+
+def normalize_dates(series, min_year=MIN_YEAR, max_year=None):
+    # Returns a DataFrame aligned with series: normalized date text, year, precision
+    # ('day', 'month' or 'year'), valid flag and the reason a value was rejected
+    max_year = max_year or date.today().year
+    present = series.notna()
+    # Datetimes render as "YYYY-MM-DD HH:MM:SS" and whole-number years as "1885.0",
+    # both of which the pattern accepts
+    text = (series.astype(object).where(present).map(str, na_action='ignore').astype(object)
+            .str.replace(r"['\"]", '', regex=True).str.strip())
+    present &= text.fillna('') != ''
+
+    parts = text.str.extract(DATE_RE)
+    year = pd.to_numeric(parts['year'], errors='coerce')
+    month = pd.to_numeric(parts['month'], errors='coerce')
+    day = pd.to_numeric(parts['day'], errors='coerce')
+
+    matched = present & year.notna()
+    year_ok = matched & year.between(min_year, max_year)
+    month_ok = month.isna() | month.between(1, 12)
+    # A real calendar day: let pandas build the date and see whether it survives
+    calendar = pd.to_datetime(pd.DataFrame({'year': year.where(year_ok & month_ok & day.notna(), 2000),
+                                            'month': month.where(year_ok & month_ok & day.notna(), 1),
+                                            'day': day.where(year_ok & month_ok & day.notna(), 1)}),
+                              errors='coerce')
+    day_ok = day.isna() | calendar.notna()
+
+    valid = year_ok & month_ok & day_ok
+    precision = pd.Series(None, index=series.index, dtype=object)
+    precision[valid & month.isna()] = 'year'
+    precision[valid & month.notna() & day.isna()] = 'month'
+    precision[valid & day.notna()] = 'day'
+
+    normalized = pd.Series(pd.NA, index=series.index, dtype=object)
+    year_text = year.astype('Int64').astype(str)
+    month_text = month.astype('Int64').astype(str).str.zfill(2)
+    day_text = day.astype('Int64').astype(str).str.zfill(2)
+    normalized[precision == 'year'] = year_text
+    normalized[precision == 'month'] = year_text + '-' + month_text
+    normalized[precision == 'day'] = year_text + '-' + month_text + '-' + day_text
+
+    reason = pd.Series('', index=series.index, dtype=object)
+    reason[~valid & ~day_ok] = 'no such day in that month'
+    reason[~valid & ~month_ok] = 'month out of range'
+    reason[~valid & matched & ~year_ok] = f'year outside {min_year}-{max_year}'
+    reason[~valid & present & ~matched] = 'not YYYY-MM-DD'
+    reason[~present] = 'missing'
+
+    return pd.DataFrame({
+        'original': series,
+        'date': normalized,
+        'year': year.where(valid).astype('Int64'),
+        'precision': precision,
+        'valid': valid,
+        'reason': reason,
+    }, index=series.index)
+
+
+def main(argv=None):
+    from sheet_cache import DEFAULT_CACHE_DIR, read_sheet
+
+    parser = argparse.ArgumentParser(description="Validate and normalize the Date column of the project workbook")
+    parser.add_argument('--input', default=r"G:/Projects/Clwyd Hall/_Resources/Clwyd Hall Project.xlsm")
+    parser.add_argument('--sheet', default="Newspapers")
+    parser.add_argument('--report', default='date_report.csv', help="Per-row validity report (CSV)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the workbook")
+    args = parser.parse_args(argv)
+
+    df = read_sheet(args.input, args.sheet, None if args.no_cache else args.cache_dir)
+    dates = normalize_dates(df['Date'])
+    # Row numbers as Excel shows them: header on row 1, data from row 2
+    dates.insert(0, 'excel_row', dates.index + 2)
+    if 'Src' in df.columns:
+        dates.insert(1, 'Src', df['Src'])
+    dates.to_csv(args.report, index=False, encoding='utf-8')
+
+    print(f"Rows: {len(dates)}")
+    print(f"Valid dates: {int(dates['valid'].sum())}")
+    for precision, count in dates['precision'].value_counts().items():
+        print(f"  precision {precision}: {count}")
+    for reason, count in dates.loc[~dates['valid'], 'reason'].value_counts().items():
+        print(f"Invalid ({reason}): {count}")
+    print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from atomic_file import load_json, save_json
+from import_pipeline import setup_logging
+
+FRONTMATTER_RE = re.compile(r'\A---\r?\n(.*?)\r?\n---\r?\n', re.DOTALL)
+
+# Member lists of the combined documents written last time, kept next to them, so a
+# document is rebuilt when a note leaves its group and removed when the group is gone
+COMBINED_MANIFEST = '.docx_combined.json'
+
+
+def find_notes(source_dir):
+    # Every .md below source_dir, skipping Obsidian's own hidden folders
+    notes = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        notes.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith('.md'))
+    return notes
+
+
+def read_frontmatter(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    match = FRONTMATTER_RE.match(content)
+    properties = {}
+    if match:
+        for line in match.group(1).splitlines():
+            key, sep, value = line.partition(':')
+            if sep and not line.startswith(' '):
+                properties[key.strip()] = value.strip().strip('"')
+    body = content[match.end():] if match else content
+    return properties, body
+
+
+def is_fresh(output, sources, reference_doc):
+    # The .docx is current if it is newer than every source note and the reference doc
+    try:
+        output_mtime = os.stat(output).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    inputs = list(sources) + ([reference_doc] if reference_doc else [])
+    return all(os.stat(path).st_mtime_ns < output_mtime for path in inputs)
+
+
+def members_hash(sources, source_dir):
+    paths = sorted(os.path.relpath(path, source_dir).replace(os.sep, '/') for path in sources)
+    return hashlib.sha1('\n'.join(paths).encode('utf-8')).hexdigest()
+
+
+def remove_stale(output_folder, previous, current):
+    # Documents written last time for groups that no longer have notes. Names are
+    # compared case-insensitively, as a Windows folder would.
+    in_use = {name.lower() for name in current}
+    removed = 0
+    for name in previous.keys() - current.keys():
+        if name.lower() in in_use:
+            continue
+        path = os.path.join(output_folder, name)
+        try:
+            os.remove(path)
+            removed += 1
+            logging.info(f"Removed combined document with no notes: {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current[name] = previous[name]
+            logging.error(f"Error removing combined document {path}: {str(e)}")
+    return removed
+
+
+def run_pandoc(pandoc, inputs, output, reference_doc):
+    command = [pandoc, *inputs, '-o', output]
+    if reference_doc:
+        command.append(f'--reference-doc={reference_doc}')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    # pandoc writes the .docx in place; convert to a short temp name in the same folder
+    # (the output name may already be at the 255-character limit), so a failed run keeps
+    # the old file
+    tmp_output = os.path.join(os.path.dirname(os.path.abspath(output)),
+                              f".{os.getpid()}-{threading.get_ident()}.tmp.docx")
+    command[command.index(output)] = tmp_output
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
+        raise RuntimeError(completed.stderr.strip() or f"pandoc exited with {completed.returncode}")
+    os.replace(tmp_output, output)
+
+
+def convert_single(pandoc, note, output, reference_doc):
+    run_pandoc(pandoc, [note], output, reference_doc)
+
+
+def convert_combined(pandoc, notes, output, reference_doc):
+    # One document per batch: the notes' bodies (frontmatter dropped) in date order,
+    # concatenated into a temporary file so the pandoc command line stays short
+    entries = []
+    for note in notes:
+        properties, body = read_frontmatter(note)
+        entries.append((str(properties.get('date', '')), os.path.basename(note), body))
+    entries.sort()
+    fd, combined = tempfile.mkstemp(suffix='.md')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for _, _, body in entries:
+                f.write(body.strip())
+                f.write('\n\n')
+        run_pandoc(pandoc, [combined], output, reference_doc)
+    finally:
+        os.remove(combined)
+
+
+def safe_name(name):
+    return re.sub(r'[<>:"/\\|?*]', '', name).strip() or 'untitled'
+
+
+def docx_filename(stem):
+    # Note names may use all 255 characters, and '.docx' is two longer than '.md'
+    return stem[:255 - len('.docx')].rstrip() + '.docx'
+
+
+def plan_jobs(notes, source_dir, output_dir, combine):
+    # Returns (output path, source notes) pairs
+    if combine is None:
+        jobs = []
+        seen = {}
+        for note in notes:
+            folder, name = os.path.split(note)
+            docx = os.path.join(folder, docx_filename(os.path.splitext(name)[0]))
+            if output_dir:
+                docx = os.path.join(output_dir, os.path.relpath(docx, source_dir))
+            # Shortening a long name can make two notes map to one document
+            if docx.lower() in seen:
+                logging.warning(f"Not converting {note}: {seen[docx.lower()]} also converts to {docx}")
+                continue
+            seen[docx.lower()] = note
+            jobs.append((docx, [note]))
+        return jobs
+
+    groups = {}
+    names = {}
+    for note in notes:
+        if combine == 'folder':
+            key = os.path.relpath(os.path.dirname(note), source_dir)
+            name = 'Notes' if key == '.' else key.replace(os.sep, ' - ')
+        else:
+            theme = read_frontmatter(note)[0].get('theme1') or 'No theme'
+            name = f"Theme - {theme}"
+        # Names that only differ in case would be the same file on Windows, so they share a document
+        name = names.setdefault(safe_name(name).lower(), safe_name(name))
+        groups.setdefault(name, []).append(note)
+    return [(os.path.join(output_dir or source_dir, docx_filename(name)), members)
+            for name, members in sorted(groups.items())]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert generated notes to Word documents with pandoc")
+    parser.add_argument('source', nargs='?', default=r"G:/Projects/Obsidian/Vaultez/Newspapers/Articles",
+                        help="Folder of .md notes (searched recursively)")
+    parser.add_argument('--reference-doc', default='reference.docx',
+                        help="Word document whose styles pandoc should copy")
+    parser.add_argument('--output-dir', help="Write .docx files here instead of next to each note")
+    parser.add_argument('--combine', choices=['folder', 'theme'],
+                        help="Produce one combined document per folder or per theme1 value")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help="Number of pandoc processes to run at once")
+    parser.add_argument('--force', action='store_true', help="Convert even when the .docx is up to date")
+    parser.add_argument('--pandoc', default='pandoc')
+    args = parser.parse_args(argv)
+
+    setup_logging('docx_export_log.txt')
+    pandoc = shutil.which(args.pandoc)
+    if pandoc is None:
+        print(f"pandoc not found: {args.pandoc}")
+        return 1
+
+    reference_doc = args.reference_doc
+    if reference_doc and not os.path.exists(reference_doc):
+        logging.warning(f"Reference document not found, using pandoc's default styles: {reference_doc}")
+        reference_doc = None
+
+    start = time.perf_counter()
+    notes = find_notes(args.source)
+    jobs = plan_jobs(notes, args.source, args.output_dir, args.combine)
+    output_folder = args.output_dir or args.source
+    combined_path = os.path.join(output_folder, COMBINED_MANIFEST)
+    # Per combine mode, so switching between folder and theme does not remove the other's documents
+    combined = load_json(combined_path) if args.combine else {}
+    previous = combined.get(args.combine, {})
+    members = {os.path.basename(output): members_hash(sources, args.source) for output, sources in jobs} \
+        if args.combine else {}
+    pending = []
+    failed = []
+    for output, sources in jobs:
+        # A note that cannot be looked at counts as failed; the rest of the run carries on
+        try:
+            fresh = not args.force and is_fresh(output, sources, reference_doc)
+        except OSError as e:
+            failed.append(output)
+            logging.error(f"Error checking {output}: {str(e)}")
+            continue
+        if not fresh or (args.combine and previous.get(os.path.basename(output)) != members[os.path.basename(output)]):
+            pending.append((output, sources))
+    skipped = len(jobs) - len(pending) - len(failed)
+
+    convert = convert_single if args.combine is None else convert_combined
+    converted = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(convert, pandoc, sources[0] if args.combine is None else sources, output,
+                                   reference_doc): output
+                   for output, sources in pending}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Converting notes"):
+            output = futures[future]
+            try:
+                future.result()
+                converted += 1
+                logging.info(f"Converted: {output}")
+            except Exception as e:
+                failed.append(output)
+                logging.error(f"Error converting {output}: {str(e)}")
+                logging.debug(traceback.format_exc())
+
+    removed = 0
+    if args.combine:
+        # A failed document is left out, so it is rebuilt next time whatever its mtime
+        current = {name: digest for name, digest in members.items()
+                   if os.path.join(output_folder, name) not in failed}
+        removed = remove_stale(output_folder, previous, current)
+        combined[args.combine] = current
+        try:
+            save_json(combined_path, combined)
+        except OSError as e:
+            logging.error(f"Error saving {combined_path}: {str(e)}")
+
+    elapsed = time.perf_counter() - start
+    print(f"\nNotes found: {len(notes)}")
+    print(f"Documents converted: {converted}")
+    print(f"Documents up to date (skipped): {skipped}")
+    if args.combine:
+        print(f"Combined documents removed (no notes left): {removed}")
+    print(f"Documents failed: {len(failed)}")
+    print(f"Elapsed: {elapsed:.1f}s")
+    logging.info(f"Notes found: {len(notes)}, converted: {converted}, skipped: {skipped}, removed: {removed}, "
+                 f"failed: {len(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,54 @@
+import logging
+import os
+from collections import namedtuple
+
+ImageEntry = namedtuple('ImageEntry', ['name', 'path', 'size', 'mtime_ns'])
+
+
+class ImageIndex:
+    # One os.scandir of the Images folder, held in memory. Lookups are case-insensitive
+    # and fall back to matching the name without its extension, so Full_Filename values
+    # that differ from the file on disk only in case or extension still resolve.
+
+    def __init__(self, images_dir):
+        self.images_dir = images_dir
+        self.by_name = {}
+        self.by_stem = {}
+        self.referenced = set()
+        try:
+            with os.scandir(images_dir) as it:
+                for entry in it:
+                    if not entry.is_file() or entry.name.startswith('.'):
+                        continue
+                    # DirEntry.stat() needs no extra round-trip on Windows
+                    st = entry.stat()
+                    self.add(ImageEntry(entry.name, entry.path, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            logging.warning(f"Images folder not found: {images_dir}")
+
+    def add(self, image):
+        self.by_name[image.name.lower()] = image
+        self.by_stem.setdefault(os.path.splitext(image.name)[0].lower(), []).append(image)
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def resolve(self, filename):
+        if not isinstance(filename, str) or not filename:
+            return None
+        key = os.path.basename(filename.replace('\\', '/')).lower()
+        image = self.by_name.get(key)
+        if image is None:
+            candidates = self.by_stem.get(os.path.splitext(key)[0])
+            if not candidates:
+                return None
+            # Several files share the stem: prefer a stable choice over an arbitrary one
+            image = min(candidates, key=lambda candidate: candidate.name)
+            if len(candidates) > 1:
+                logging.debug(f"{filename} matches {len(candidates)} images, using {image.name}")
+        self.referenced.add(image.name.lower())
+        return image
+
+    def unreferenced(self):
+        # Images in the folder that no resolved row pointed at
+        return sorted(image.name for key, image in self.by_name.items() if key not in self.referenced)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+
+from atomic_file import save_json
+from note_template import format_value
+
+# The manifest lives inside the vault folder; Obsidian ignores dot-files
+MANIFEST_FILENAME = '.import_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    # Hash the file contents in chunks so large scans are never read into memory at once
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_row(row, template=''):
+    # Hash every column value (NaN counts as empty) together with the template,
+    # so editing either the row or the template marks the note as changed
+    digest = hashlib.sha1(template.encode('utf-8'))
+    for key in sorted(row.keys()):
+        value = format_value(row[key])
+        digest.update(f"\x1f{key}\x1e{value}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ImportManifest:
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.entries = {}
+        self.images = {}
+        self.seen_images = set()
+        # Set by every change, so a run that changed nothing can skip rewriting the file
+        self.dirty = False
+
+    @classmethod
+    def load(cls, output_dir):
+        manifest = cls(output_dir)
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                manifest.entries = data.get('entries', {})
+                manifest.images = data.get('images', {})
+        except (OSError, ValueError):
+            # A missing or unreadable manifest just means a full import
+            pass
+        return manifest
+
+    def save(self):
+        data = {'version': MANIFEST_VERSION, 'entries': self.entries, 'images': self.images}
+        save_json(self.path, data)
+        self.dirty = False
+
+    def image_hash(self, file_path, stat=None):
+        # Only re-hash an image when its size or mtime changed since the last run.
+        # Callers that already know (size, mtime_ns), e.g. from a directory scan, pass it in.
+        if stat is None:
+            try:
+                st = os.stat(file_path)
+            except (OSError, TypeError, ValueError):
+                return None
+            stat = (st.st_size, st.st_mtime_ns)
+        self.seen_images.add(file_path)
+        signature = list(stat)
+        cached = self.images.get(file_path)
+        if cached and cached['stat'] == signature:
+            return cached['hash']
+        file_hash = hash_file(file_path)
+        self.images[file_path] = {'stat': signature, 'hash': file_hash}
+        self.dirty = True
+        return file_hash
+
+    def status(self, key, row_hash, image_hash, note_path, thumbnails_dir=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return 'new'
+        if entry['row_hash'] != row_hash or entry['image_hash'] != image_hash:
+            return 'changed'
+        # Regenerate notes (or thumbnails) that were deleted from the vault by hand
+        if not os.path.exists(note_path):
+            return 'changed'
+        if thumbnails_dir and any(not os.path.exists(os.path.join(thumbnails_dir, name))
+                                  for name in self.thumbnails(key).values()):
+            return 'changed'
+        return 'unchanged'
+
+    def thumbnails(self, key):
+        # {profile name: thumbnail filename} recorded for a row; older manifests kept a single name
+        entry = self.entries.get(key) or {}
+        if entry.get('thumbnails'):
+            return entry['thumbnails']
+        return {'small': entry['thumbnail']} if entry.get('thumbnail') else {}
+
+    def record(self, key, row_hash, image_hash, thumbnails=None):
+        self.entries[key] = {'row_hash': row_hash, 'image_hash': image_hash, 'thumbnails': thumbnails or {}}
+        self.dirty = True
+
+    def forget(self, key):
+        if self.entries.pop(key, None) is not None:
+            self.dirty = True
+
+    def prune(self, seen_keys):
+        # Forget rows that are no longer in the workbook and report how many went away
+        removed = [key for key in self.entries if key not in seen_keys]
+        for key in removed:
+            del self.entries[key]
+        images = {path: info for path, info in self.images.items() if path in self.seen_images}
+        if removed or len(images) != len(self.images):
+            self.dirty = True
+        self.images = images
+        return removed
@@ -0,0 +1,127 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+from tqdm import tqdm
+
+from run_report import timer
+from sheet_stream import SheetStream
+
+# An importer handles the rows of one or more Src codes. It exposes:
+#   name     - label used in the summary
+#   sources  - the Src values it renders
+#   columns  - the sheet columns it reads (None for all), used when streaming
+#   plan(df) - receives its rows of the sheet and returns the work items to render;
+#              when streaming it is called once per chunk
+#   render(item)
+#   finish() - saves any state and returns a dict of summary counts
+
+
+def setup_logging(filename, level='DEBUG'):
+    # Log records go onto a queue and a background listener writes them to the file,
+    # so log calls in the row loop never wait on disk I/O
+    file_handler = logging.FileHandler(filename, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def add_run_options(parser, report):
+    parser.add_argument('--log-level', default='DEBUG', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Minimum level written to the log file")
+    parser.add_argument('--report', default=report, help="Where to write the JSON run report")
+
+
+def route_sources(importers):
+    routes = {}
+    for importer in importers:
+        for src in importer.sources:
+            if src in routes:
+                raise ValueError(f"Src {src} is claimed by both {routes[src].name} and {importer.name}")
+            routes[src] = importer
+    return routes
+
+
+def run_importers(df, importers, desc="Processing records"):
+    # One pass over the sheet: each importer plans its own rows, then all work items
+    # share a single progress bar
+    routes = route_sources(importers)
+    src = df['Src']
+    unrouted = int((~src.isin(list(routes))).sum())
+
+    work = []
+    for importer in importers:
+        with timer.stage('filter'):
+            rows = df[src.isin(list(importer.sources))]
+        items = importer.plan(rows)
+        work.extend((importer, item) for item in items)
+
+    try:
+        for importer, item in tqdm(work, total=len(work), desc=desc):
+            importer.render(item)
+    finally:
+        summaries = [(importer.name, importer.finish()) for importer in importers]
+
+    report_summary(len(df), unrouted, summaries)
+    return summaries
+
+
+def add_stream_options(parser):
+    parser.add_argument('--stream', action='store_true',
+                        help="Read the sheet row by row in bounded chunks instead of loading it whole")
+    parser.add_argument('--chunk-size', type=int, default=500,
+                        help="Rows per chunk in --stream mode")
+
+
+def stream_importers(input_file, sheet_name, importers, chunk_size=500, desc="Processing records"):
+    # Streaming counterpart of run_importers: rows are read, filtered by Src and
+    # rendered one chunk at a time, so the first notes are written while the rest
+    # of the sheet is still being read
+    routes = route_sources(importers)
+    columns = set()
+    for importer in importers:
+        if importer.columns is None:
+            columns = None
+            break
+        columns |= set(importer.columns)
+    stream = SheetStream(input_file, sheet_name, sources=routes, columns=columns, chunk_size=chunk_size)
+
+    try:
+        with tqdm(desc=desc, unit='notes') as bar:
+            for chunk in stream:
+                src = chunk['Src']
+                for importer in importers:
+                    rows = chunk[src.isin(list(importer.sources))]
+                    if rows.empty:
+                        continue
+                    for item in importer.plan(rows):
+                        importer.render(item)
+                        bar.update()
+    finally:
+        summaries = [(importer.name, importer.finish()) for importer in importers]
+
+    report_summary(stream.rows_read, stream.rows_skipped, summaries)
+    return summaries
+
+
+def report_summary(total_rows, unrouted, summaries):
+    lines = [f"Rows in sheet: {total_rows}", f"Rows with no importer for their Src: {unrouted}"]
+    for name, summary in summaries:
+        lines.append(f"[{name}]")
+        lines.extend(f"  {label}: {value}" for label, value in summary.items())
+
+    print()
+    for line in lines:
+        print(line)
+        logging.info(line.strip())
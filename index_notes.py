@@ -0,0 +1,93 @@
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+from note_template import format_value
+from note_writer import sync_notes
+from row_prep import NAME_COLUMNS, PLACE_COLUMNS, THEME_COLUMNS
+from run_report import timer
+
+# One hub note per person, place and theme, listing the articles that mention it.
+# The index is filled from the same pass over the rows that classifies them, so hub
+# pages are plain Markdown and need no Dataview query over every note to open.
+
+INDEX_KINDS = [
+    # (kind, folder, tag prefix, workbook columns)
+    ('person', 'People', '#Person-', NAME_COLUMNS),
+    ('place', 'Places', '#Place-', PLACE_COLUMNS),
+    ('theme', 'Themes', '#Theme-', THEME_COLUMNS),
+]
+
+# Membership hashes of the index notes written last time, kept next to the manifest
+STATE_FILENAME = '.index_notes.json'
+
+
+# The same few hundred names recur across every row
+@lru_cache(maxsize=4096)
+def index_filename(value):
+    return re.sub(r'[<>:"/\\|?*]', '', value).strip() + '.md'
+
+
+class IndexBuilder:
+    def __init__(self, output_dir, full=False, articles_folder='Articles'):
+        self.full = full
+        self.index_dir = os.path.join(output_dir, 'Index')
+        self.state_path = os.path.join(output_dir, STATE_FILENAME)
+        self.articles_folder = articles_folder
+        # (kind, lowercased file name) -> {'value', 'articles': {note stem: date}}
+        self.entries = {}
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def add(self, row):
+        stem = os.path.splitext(row['note_filename'])[0]
+        date = row.get('Date')
+        # Undated and invalid dates sort after the dated articles
+        date = date if isinstance(date, str) and not row.get('date_problem') else ''
+        for kind, folder, prefix, columns in INDEX_KINDS:
+            for name in columns:
+                value = format_value(row.get(name)).strip()
+                if not value or index_filename(value) == '.md':
+                    continue
+                # Windows folders are case-insensitive, so "John Smith" and "john smith" share a note
+                entry = self.entries.setdefault((kind, index_filename(value).lower()),
+                                                {'value': value, 'articles': {}})
+                entry['articles'][stem] = date
+
+    def render(self, kind, prefix, entry):
+        articles = sorted(entry['articles'].items(), key=lambda item: (item[1] == '', item[1], item[0]))
+        quoted = entry['value'].replace('"', '\\"')
+        lines = ['---', f"index: {kind}", f'name: "{quoted}"', f"articles: {len(articles)}", '---', '',
+                 f"# {entry['value']}", '']
+        for stem, date in articles:
+            lines.append(f"- {date + ' ' if date else ''}[[{self.articles_folder}/{stem}|{stem}]]")
+        lines += ['', prefix + entry['value'].replace(' ', '-'), '']
+        return '\n'.join(lines)
+
+    def notes(self):
+        # (relpath, digest, render) for sync_notes, rendered one at a time
+        kinds = {kind: (folder, prefix) for kind, folder, prefix, _ in INDEX_KINDS}
+        for (kind, _), entry in self.entries.items():
+            folder, prefix = kinds[kind]
+            content = self.render(kind, prefix, entry)
+            digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+            yield f"{folder}/{index_filename(entry['value'])}", digest, lambda content=content: content
+
+    def write(self):
+        # Only notes whose rendered list differs from the last run (or that have gone
+        # missing) are written; notes for values no longer in the workbook are removed
+        with timer.stage('index_notes'):
+            for _, folder, _, _ in INDEX_KINDS:
+                os.makedirs(os.path.join(self.index_dir, folder), exist_ok=True)
+            _, counts = sync_notes(self.index_dir, self.state_path, self.notes(), self.full, 'index')
+        self.written += counts['written']
+        self.unchanged += counts['unchanged']
+        self.removed += counts['removed']
+
+        return {
+            'Index notes written': self.written,
+            'Index notes unchanged': self.unchanged,
+            'Index notes removed': self.removed,
+        }
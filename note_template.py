@@ -0,0 +1,55 @@
+import re
+
+import pandas as pd
+
+PLACEHOLDER_RE = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}')
+
+
+def format_value(value):
+    # Missing and NaN cells render as an empty string, everything else through str()
+    if value is None:
+        return ''
+    try:
+        if pd.isna(value):
+            return ''
+    except (TypeError, ValueError):
+        # pd.isna on list-like values returns an array; those are never "missing"
+        pass
+    if isinstance(value, float) and value.is_integer():
+        # pd.read_excel reads a numeric column with blank cells as floats; whole numbers
+        # lose the ".0" so they render as typed, and as --stream (openpyxl's ints) does
+        return str(int(value))
+    return str(value)
+
+
+class NoteTemplate:
+    # A template is parsed once into alternating literal text and placeholder names,
+    # so rendering a row is a single join instead of one str.replace pass per column
+
+    def __init__(self, text):
+        self.text = text
+        self.literals = []
+        self.names = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            self.literals.append(text[position:match.start()])
+            self.names.append(match.group(1))
+            position = match.end()
+        self.literals.append(text[position:])
+        self.placeholders = frozenset(self.names)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def missing(self, values):
+        # Placeholder names that the given values do not provide
+        return sorted(name for name in self.placeholders if name not in values)
+
+    def render(self, values):
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(format_value(values.get(name)))
+            parts.append(literal)
+        return ''.join(parts)
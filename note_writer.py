@@ -0,0 +1,183 @@
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_file import load_json, save_json
+from run_report import timer
+
+# Lines that change on every import and should not, on their own, cause a rewrite
+VOLATILE_LINE_RE = re.compile(r'^last_imported:.*$', re.MULTILINE)
+
+
+def strip_volatile(content):
+    return VOLATILE_LINE_RE.sub('', content)
+
+
+def write_note(filepath, content):
+    # Returns False when the note on disk already has this content (apart from volatile
+    # lines). Otherwise writes a temporary file and renames it over the note, so Obsidian
+    # never sees a half-written note.
+    with timer.stage('write', filepath):
+        return _write_note(filepath, content)
+
+
+def _write_note(filepath, content):
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            existing = f.read()
+        if strip_volatile(existing) == strip_volatile(content):
+            return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+
+    # A short dot-file name in the same folder: the note name may already be at the
+    # 255-character limit, and Obsidian ignores dot-files
+    tmp_path = os.path.join(os.path.dirname(filepath), f".{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def remove_case_variant(old_path, new_path):
+    # old_path is a note's previous name, differing from new_path only in case. On a
+    # case-insensitive drive it is the note just written and must stay; elsewhere it is
+    # a stale copy. Returns True when a stale copy was removed.
+    try:
+        if os.path.samefile(old_path, new_path):
+            return False
+        os.remove(old_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def sync_notes(root_dir, state_path, notes, full=False, kind='generated'):
+    # Keeps a folder of generated notes in step with what should exist. notes yields
+    # (path relative to root_dir with '/', digest, render) for every wanted note; render()
+    # returns its content and is only called when the digest differs from the one saved
+    # in state_path last run (or the note has gone missing). Notes from last run that are
+    # no longer wanted are removed. Returns the new state and the counts.
+    previous = load_json(state_path)
+    # A note's name can change case between runs (it follows the first-seen spelling of
+    # a value); notes are matched to last run's case-insensitively, as on Windows
+    previous_paths = {relpath.lower(): relpath for relpath in previous}
+    state = {}
+    # Every note still wanted, lowercased; one that could not be written keeps its old
+    # file until the next run
+    in_use = set()
+    counts = {'written': 0, 'unchanged': 0, 'removed': 0}
+    for relpath, digest, render in notes:
+        state[relpath] = digest
+        in_use.add(relpath.lower())
+        path = os.path.join(root_dir, *relpath.split('/'))
+        if not full and previous.get(relpath) == digest and os.path.exists(path):
+            counts['unchanged'] += 1
+            continue
+        try:
+            write_note(path, render())
+            counts['written'] += 1
+            logging.debug(f"Wrote {kind} note: {path}")
+        except Exception as e:
+            state.pop(relpath)
+            logging.error(f"Error writing {kind} note {path}: {str(e)}")
+            continue
+        old_relpath = previous_paths.get(relpath.lower(), relpath)
+        if old_relpath != relpath:
+            old_path = os.path.join(root_dir, *old_relpath.split('/'))
+            if remove_case_variant(old_path, path):
+                logging.info(f"Removed {kind} note under its old spelling: {old_path}")
+
+    for relpath in previous.keys() - state.keys():
+        if relpath.lower() in in_use:
+            continue
+        path = os.path.join(root_dir, *relpath.split('/'))
+        try:
+            os.remove(path)
+            counts['removed'] += 1
+            logging.info(f"Removed {kind} note no longer needed: {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            state[relpath] = previous[relpath]
+            logging.error(f"Error removing {kind} note {path}: {str(e)}")
+    save_json(state_path, state)
+    return state, counts
+
+
+class NoteWriter:
+    # Write-behind stage: rendered notes are queued to a small pool of writer threads so
+    # slow (synced or network) drives do not stall rendering. At most max_pending notes
+    # are held in memory; write() blocks once that many are waiting.
+
+    def __init__(self, threads=4, max_pending=256):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='note-writer')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.path_locks = {}
+        self.latest = {}
+        self.sequence = 0
+        self.written = 0
+        self.skipped = 0
+        self.superseded = 0
+        self.failed = []
+        self.write_time = 0.0
+        self.wait_time = 0.0
+
+    def write(self, filepath, content):
+        start = time.perf_counter()
+        self.slots.acquire()
+        self.wait_time += time.perf_counter() - start
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+            # If the same note is queued twice in one run, only the last version is written
+            self.latest[filepath] = sequence
+            path_lock = self.path_locks.setdefault(filepath, threading.Lock())
+        future = self.executor.submit(self._write, filepath, content, sequence, path_lock)
+        future.add_done_callback(lambda f: self.slots.release())
+
+    def _write(self, filepath, content, sequence, path_lock):
+        start = time.perf_counter()
+        try:
+            with path_lock:
+                if self.latest.get(filepath) != sequence:
+                    outcome = 'superseded'
+                elif write_note(filepath, content):
+                    outcome = 'written'
+                    logging.debug(f"Wrote note: {filepath}")
+                else:
+                    outcome = 'skipped'
+                    logging.debug(f"Note unchanged on disk, skipped write: {filepath}")
+        except Exception as e:
+            outcome = None
+            logging.error(f"Error writing note {filepath}: {str(e)}")
+            logging.debug(traceback.format_exc())
+        with self.lock:
+            self.write_time += time.perf_counter() - start
+            if outcome is None:
+                self.failed.append(filepath)
+            else:
+                setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def close(self):
+        # Wait for every queued note; the time spent here is write latency rendering did not hide
+        start = time.perf_counter()
+        self.executor.shutdown(wait=True)
+        self.wait_time += time.perf_counter() - start
+        return {
+            'Notes written': self.written,
+            'Notes identical on disk (skipped)': self.skipped,
+            'Note writes failed': len(self.failed),
+            'Write time, summed over writer threads (s)': round(self.write_time, 3),
+            'Time waiting on writers (s)': round(self.wait_time, 3),
+        }
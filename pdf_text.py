@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+
+from atomic_file import save_json
+
+# Text layers of PDF scans, cached per file *contents* so a PDF is only read for text
+# once however often its row changes. One small JSON file per PDF: {"pages": n, "text": [...]}
+TEXT_DIRNAME = '.transcripts'
+
+
+class TextCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.extracted = 0
+        self.reused = 0
+
+    def path(self, file_hash):
+        return os.path.join(self.cache_dir, f"{file_hash}.json")
+
+    def load(self, file_hash):
+        try:
+            with open(self.path(file_hash), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable transcript cache {self.path(file_hash)}: {str(e)}")
+            return None
+
+
+def save_text(doc, text_path):
+    # doc is an open fitz document; every page's embedded text layer is kept
+    info = {'pages': doc.page_count, 'text': [page.get_text('text') for page in doc]}
+    os.makedirs(os.path.dirname(text_path), exist_ok=True)
+    save_json(text_path, info, indent=None, sort_keys=False, ensure_ascii=False)
+    return info
+
+
+def transcript_section(info):
+    # A folded callout under "## Transcript", one bold "Page n" line per page with text;
+    # empty when the PDF has no text layer (an image-only scan)
+    if not info or not any(page.strip() for page in info['text']):
+        return ''
+    lines = ['', '## Transcript', f"> [!quote]- Transcript ({info['pages']} pages)"]
+    for number, page in enumerate(info['text'], 1):
+        page_lines = [line.rstrip() for line in page.strip().splitlines()]
+        if not page_lines:
+            continue
+        lines.append('>')
+        lines.append(f"> **Page {number}**")
+        previous_blank = False
+        for line in page_lines:
+            # Keep paragraph breaks but not runs of empty lines
+            if not line and previous_blank:
+                continue
+            previous_blank = not line
+            lines.append(f"> {line}" if line else '>')
+    lines.append('')
+    return '\n'.join(lines)
@@ -0,0 +1,138 @@
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+from PIL import Image, UnidentifiedImageError
+
+# Decoding image scans for thumbnails without holding more of them in memory than
+# needed. JPEGs are decoded straight at 1/2, 1/4 or 1/8 scale; other formats are
+# decoded in their own (usually 1-byte) mode and shrunk by whole factors with
+# Image.reduce before any colour conversion, so a 600 dpi scan never exists as a
+# full-size RGB copy. The shrunk image is left about twice the thumbnail size for
+# save_thumbnails to finish with a proper resample.
+
+DEFAULT_MAX_DECODE_MB = 1000
+REDUCING_GAP = 2.0
+# Rows per strip when a mode has to be converted before it can be reduced
+STRIP_ROWS = 64
+
+# Pillow keeps these modes at 1 byte per pixel and 16-bit greyscale at 2; everything
+# else, RGB included, takes 4
+ONE_BYTE_MODES = {'1', 'L', 'P'}
+# Modes Image.reduce cannot work on (or, with alpha, only through a full premultiplied
+# copy), and what they are converted to strip by strip first. Alpha is dropped, as the
+# thumbnails always did.
+STRIP_CONVERT = {'1': 'L', 'P': 'RGB', 'PA': 'RGB', 'LA': 'L', 'RGBA': 'RGB',
+                 'I;16': 'I', 'I;16L': 'I', 'I;16B': 'I', 'I;16N': 'I'}
+
+
+class RasterDecodeError(ValueError):
+    pass
+
+
+# Pillow's limit is a module global, so lifting it is serialised within the process
+_pixel_limit_lock = threading.Lock()
+
+
+@contextmanager
+def pixel_limit_lifted():
+    # Instead of Pillow's pixel-count guard (a warning, then DecompressionBombError at
+    # twice the limit), decode_raster refuses scans whose decode would need more memory
+    # than max_bytes, before reading any pixel data. The guard is only off while a scan
+    # is being decoded; every other Image.open in the process keeps it.
+    with _pixel_limit_lock:
+        saved = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None
+        try:
+            yield
+        finally:
+            Image.MAX_IMAGE_PIXELS = saved
+
+
+def pixel_bytes(mode):
+    if mode in ONE_BYTE_MODES:
+        return 1
+    if mode.startswith('I;16'):
+        return 2
+    return 4
+
+
+def output_mode(img, grayscale):
+    # Greyscale scans stay greyscale; only colour ones become RGB
+    if grayscale or img.mode in ('1', 'L', 'LA', 'I', 'F') or img.mode.startswith('I;16'):
+        return 'L'
+    return 'RGB'
+
+
+def to_reducible(img):
+    mode = STRIP_CONVERT[img.mode]
+    if mode == 'I':
+        # 16-bit samples scaled to 8 bits, where convert('L') would clip them
+        return img.convert('I').point(lambda value: value * (1 / 256))
+    return img.convert(mode)
+
+
+def reduce_by(img, factor):
+    # Modes Image.reduce accepts are reduced in one go; the others are converted and
+    # reduced a strip at a time, so only one strip exists in the wider mode
+    if img.mode not in STRIP_CONVERT:
+        return img.reduce(factor) if factor > 1 else img
+    if factor == 1:
+        return to_reducible(img)
+    width, height = img.size
+    rows = STRIP_ROWS * factor
+    reduced = None
+    for top in range(0, height, rows):
+        strip = to_reducible(img.crop((0, top, width, min(top + rows, height)))).reduce(factor)
+        if reduced is None:
+            reduced = Image.new(strip.mode, (math.ceil(width / factor), math.ceil(height / factor)))
+        reduced.paste(strip, (0, top // factor))
+    return reduced
+
+
+def to_mode(img, mode):
+    if img.mode == mode:
+        return img
+    if img.mode == 'I':
+        # 16-bit samples that were not scaled on the way in (a 32-bit integer TIFF)
+        img = img.point(lambda value: value * (1 / 256)) if img.getextrema()[1] > 255 else img
+    return img.convert(mode)
+
+
+def decode_raster(file_path, box, grayscale=False, max_bytes=DEFAULT_MAX_DECODE_MB * 1000000):
+    # Returns the first frame of the scan in L or RGB, shrunk to no less than
+    # REDUCING_GAP times the size that fits in box. Unreadable or oversized files raise
+    # RasterDecodeError; max_bytes of 0 or None means no limit.
+    with pixel_limit_lifted():
+        return _decode_raster(file_path, box, grayscale, max_bytes)
+
+
+def _decode_raster(file_path, box, grayscale, max_bytes):
+    try:
+        img = Image.open(file_path)
+    except UnidentifiedImageError:
+        raise RasterDecodeError(f"not an image file Pillow can read: {os.path.basename(file_path)}")
+    except OSError as e:
+        # A damaged header, e.g. a JPEG cut off before its frame header
+        raise RasterDecodeError(f"could not open {os.path.basename(file_path)}: {str(e)}")
+    with img:
+        width, height = img.size
+        scale = min(box[0] / width, box[1] / height, 1.0)
+        target = (max(1, math.ceil(width * scale * REDUCING_GAP)), max(1, math.ceil(height * scale * REDUCING_GAP)))
+        mode = output_mode(img, grayscale)
+        if img.format == 'JPEG':
+            # Lets libjpeg skip most of the work; also decodes greyscale directly when asked
+            img.draft(mode, target)
+        needed = img.size[0] * img.size[1] * pixel_bytes(img.mode)
+        if max_bytes and needed > max_bytes:
+            raise RasterDecodeError(f"{width}x{height} {img.mode} scan needs {needed / 1e6:.0f} MB to decode, "
+                                    f"over the {max_bytes / 1e6:.0f} MB limit")
+        try:
+            img.load()
+        except (OSError, SyntaxError) as e:
+            raise RasterDecodeError(f"damaged or truncated image: {str(e)}")
+        factor = max(1, min(img.size[0] // target[0], img.size[1] // target[1]))
+        decoded = to_mode(reduce_by(img, factor), mode)
+        # Closing the file also frees an image that came through unchanged
+        return decoded.copy() if decoded is img else decoded
@@ -0,0 +1,216 @@
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+from run_report import timer
+
+# Every imported row in one SQLite file at the root of the vault, with an FTS5 index
+# over the article, people, places, themes and PDF text, so "which notes mention X"
+# is a single indexed query instead of a search of every note. Obsidian ignores dot-files.
+RECORDS_FILENAME = '.vault_records.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    note_path TEXT NOT NULL UNIQUE,
+    src TEXT,
+    date TEXT,
+    year INTEGER,
+    article TEXT,
+    themes TEXT,
+    names TEXT,
+    places TEXT,
+    thumbnail TEXT,
+    text TEXT,
+    excel_row INTEGER,
+    record_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS records_src ON records (src);
+CREATE INDEX IF NOT EXISTS records_year ON records (year);
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5 (
+    article, names, places, themes, text, content='records', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+    INSERT INTO records_fts (rowid, article, names, places, themes, text)
+    VALUES (new.id, new.article, new.names, new.places, new.themes, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+    INSERT INTO records_fts (records_fts, rowid, article, names, places, themes, text)
+    VALUES ('delete', old.id, old.article, old.names, old.places, old.themes, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS records_au AFTER UPDATE ON records BEGIN
+    INSERT INTO records_fts (records_fts, rowid, article, names, places, themes, text)
+    VALUES ('delete', old.id, old.article, old.names, old.places, old.themes, old.text);
+    INSERT INTO records_fts (rowid, article, names, places, themes, text)
+    VALUES (new.id, new.article, new.names, new.places, new.themes, new.text);
+END;
+"""
+
+FIELDS = ['note_path', 'src', 'date', 'year', 'article', 'themes', 'names', 'places', 'thumbnail', 'text',
+          'excel_row', 'record_hash']
+
+UPSERT = f"""
+INSERT INTO records ({', '.join(FIELDS)}) VALUES ({', '.join('?' for _ in FIELDS)})
+ON CONFLICT (note_path) DO UPDATE SET {', '.join(f'{name} = excluded.{name}' for name in FIELDS[1:])}
+"""
+
+
+def default_path(output_dir):
+    # Importers write into a section folder (Newspapers, Census) of the vault
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), RECORDS_FILENAME)
+
+
+def joined(row, columns):
+    values = [row.get(name) for name in columns]
+    return '; '.join(str(value) for value in values if value is not None and pd.notna(value) and str(value).strip())
+
+
+def record_hash(*parts):
+    return hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+class RecordIndex:
+    # Rows are upserted in batches during the import pass. known holds the hash of
+    # every stored row, so unchanged rows cost a dict lookup and are not rewritten.
+
+    def __init__(self, path, batch_size=500):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.batch_size = batch_size
+        # The importers create their own folders later; the vault may not exist yet
+        os.makedirs(self.root, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.known = dict(self.conn.execute("SELECT note_path, record_hash FROM records"))
+        self.pending = []
+        self.seen = set()
+        self.upserted = Counter()
+
+    def note_path(self, filepath):
+        # Stored relative to the vault and with forward slashes, as Obsidian links are
+        return os.path.relpath(os.path.abspath(filepath), self.root).replace(os.sep, '/')
+
+    def needs(self, filepath, hash_value):
+        # Marks the note as present in this run; False when the stored row is current
+        note_path = self.note_path(filepath)
+        self.seen.add(note_path)
+        return self.known.get(note_path) != hash_value
+
+    def keep(self, filepath):
+        # The note is still present but was not looked at in this pass
+        self.seen.add(self.note_path(filepath))
+
+    def forget(self, filepath):
+        # The note could not be written: keep it out of the database, and drop a stored
+        # row in finish(), so the next run adds it again once the write succeeds
+        note_path = self.note_path(filepath)
+        self.seen.discard(note_path)
+        self.known.pop(note_path, None)
+        self.pending = [entry for entry in self.pending if entry[0] != note_path]
+
+    def add(self, filepath, hash_value, src=None, date=None, year=None, article=None, themes=None, names=None,
+            places=None, thumbnail=None, text=None, excel_row=None):
+        note_path = self.note_path(filepath)
+        self.seen.add(note_path)
+        self.known[note_path] = hash_value
+        self.pending.append((note_path, src, date, year, article, themes, names, places, thumbnail, text,
+                             excel_row, hash_value))
+        self.upserted[src] += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with timer.stage('records_db'):
+            with self.conn:
+                self.conn.executemany(UPSERT, self.pending)
+        self.pending = []
+
+    def finish(self, sources):
+        # Drop rows of these Src values that were not seen in this run, then commit.
+        # Importers sharing the database each finish their own sources.
+        self.flush()
+        with timer.stage('records_db'):
+            with self.conn:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (note_path TEXT PRIMARY KEY)")
+                self.conn.execute("DELETE FROM seen")
+                self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((path,) for path in self.seen))
+                placeholders = ', '.join('?' for _ in sources)
+                removed = self.conn.execute(
+                    f"DELETE FROM records WHERE src IN ({placeholders}) "
+                    f"AND note_path NOT IN (SELECT note_path FROM seen)", list(sources)).rowcount
+        summary = {'Records upserted into database': sum(self.upserted[src] for src in sources),
+                   'Records removed from database': removed}
+        logging.info(f"Record database {self.path}: {summary}")
+        return summary
+
+    def close(self):
+        self.conn.close()
+
+
+def fts_query(text):
+    # Every term quoted, for input that is not valid FTS5 syntax
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def search(conn, text, src=None, year_from=None, year_to=None, limit=50):
+    where, params = ["records_fts MATCH ?"], []
+    for column, op, value in [('src', '=', src), ('year', '>=', year_from), ('year', '<=', year_to)]:
+        if value is not None:
+            where.append(f"r.{column} {op} ?")
+            params.append(value)
+    sql = (f"SELECT r.note_path, r.date, r.article FROM records_fts JOIN records r ON r.id = records_fts.rowid "
+           f"WHERE {' AND '.join(where)} ORDER BY bm25(records_fts) LIMIT ?")
+    # FTS5 syntax such as "exact phrase", OR, NEAR and prefix* is passed through
+    try:
+        return conn.execute(sql, [text, *params, limit]).fetchall()
+    except sqlite3.OperationalError:
+        return conn.execute(sql, [fts_query(text), *params, limit]).fetchall()
+
+
+def add_records_options(parser):
+    parser.add_argument('--records-db', help="SQLite database of imported records "
+                                             f"(default: {RECORDS_FILENAME} in the vault folder)")
+    parser.add_argument('--no-records', action='store_true', help="Do not update the records database")
+
+
+def open_records(args, output_dir):
+    if args.no_records:
+        return None
+    return RecordIndex(args.records_db or default_path(output_dir))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the imported records for notes mentioning a name, "
+                                                 "place, theme or word")
+    parser.add_argument('query', help='FTS5 query, e.g. "John Smith" or llany* OR ruthin')
+    parser.add_argument('--db', default=os.path.join(r"G:/Projects/Obsidian/Vaultez", RECORDS_FILENAME))
+    parser.add_argument('--src', help="Only records with this Src")
+    parser.add_argument('--from-year', type=int)
+    parser.add_argument('--to-year', type=int)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No record database at {args.db}; run an import first")
+        return 1
+    conn = sqlite3.connect(Path(os.path.abspath(args.db)).as_uri() + '?mode=ro', uri=True)
+    start = time.perf_counter()
+    rows = search(conn, args.query, args.src, args.from_year, args.to_year, args.limit)
+    elapsed = time.perf_counter() - start
+    for note_path, date, article in rows:
+        print(f"{note_path}\t{date or ''}\t{article or ''}")
+    print(f"{len(rows)} match(es) in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
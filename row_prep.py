@@ -0,0 +1,85 @@
+import pandas as pd
+
+from date_normalize import normalize_dates
+
+# Derived fields computed for the whole filtered sheet at once, so the per-row work
+# in create_note is only string formatting
+
+THEME_COLUMNS = ['T', 'Theme_2', 'Theme_3', 'Theme_4', 'Theme_5']
+NAME_COLUMNS = ['Name_1', 'Name_2']
+PLACE_COLUMNS = ['Place_1', 'Place_2']
+# Every column prepare_rows reads
+INPUT_COLUMNS = ['Src', 'Full_Filename', 'Article', 'Date'] + THEME_COLUMNS + NAME_COLUMNS + PLACE_COLUMNS
+
+
+def column(df, name):
+    # Missing columns behave like a column of empty cells
+    if name in df.columns:
+        return df[name]
+    return pd.Series(pd.NA, index=df.index, dtype=object)
+
+
+def as_text(series):
+    # Non-missing values as strings, missing values kept as NA
+    return series.astype(object).where(series.notna()).map(str, na_action='ignore').astype(object)
+
+
+def join_present(parts, sep):
+    # Per row, join the non-missing values of several Series with sep ('' if none are present)
+    result = None
+    for part in parts:
+        if result is None:
+            result = part
+        else:
+            result = (result + sep + part).fillna(result).fillna(part)
+    return result.fillna('')
+
+
+def clean_filenames(series):
+    # Vectorized clean_filename: strip invalid characters, collapse whitespace, fall back
+    # to untitled_file for empty names or names starting with a dot
+    cleaned = (as_text(series).fillna('')
+               .str.replace(r'[<>:"/\\|?*]', '', regex=True)
+               .str.replace(r'\s+', ' ', regex=True)
+               .str.strip())
+    return cleaned.where((cleaned != '') & ~cleaned.str.startswith('.'), 'untitled_file')
+
+
+def note_filenames(series):
+    filenames = clean_filenames(series) + '.md'
+    too_long = filenames.str.len() > 255
+    # A cut can end in a space, which Obsidian drops from link targets, so it is stripped
+    return filenames.where(~too_long, filenames.str[:252].str.rstrip() + '.md')
+
+
+def base_filenames(series):
+    # Keep only the file name; workbook paths may use either separator
+    return as_text(series).str.replace(r'^.*[\\/]', '', regex=True)
+
+
+def tag_values(df, columns, prefix):
+    return [prefix + as_text(column(df, name)).str.replace(' ', '-') for name in columns]
+
+
+def prepare_rows(df):
+    df = df.copy()
+    df['Full_Filename'] = base_filenames(column(df, 'Full_Filename'))
+    df['note_filename'] = note_filenames(column(df, 'Article'))
+
+    df['people_involved'] = join_present(['- ' + as_text(column(df, name)) for name in NAME_COLUMNS], '\n')
+    df['locations'] = join_present(['- ' + as_text(column(df, name)) for name in PLACE_COLUMNS], '\n')
+
+    # Valid dates (full or partial) are written normalized; anything else is kept as typed
+    # and reported, and only valid dates produce a #Year- tag
+    dates = normalize_dates(column(df, 'Date'))
+    df['Date'] = dates['date'].where(dates['valid'], column(df, 'Date'))
+    df['date_problem'] = dates['reason'].where(dates['reason'] != 'missing', '')
+    df['year'] = as_text(dates['year'])
+
+    tags = ['#Source-' + as_text(column(df, 'Src')).fillna('')]
+    tags += tag_values(df, THEME_COLUMNS, '#Theme-')
+    tags += tag_values(df, NAME_COLUMNS, '#Person-')
+    tags += tag_values(df, PLACE_COLUMNS, '#Place-')
+    tags.append('#Year-' + df['year'])
+    df['tags'] = join_present(tags, ' ')
+    return df
@@ -0,0 +1,83 @@
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from atomic_file import save_json
+
+
+class RunTimer:
+    # Accumulates wall and CPU time per pipeline stage, plus the slowest individual items
+    # of each kind. CPU time is per thread (time.thread_time), so work done by writer
+    # threads is charged to the stage that ran it and not to whatever the main thread
+    # was doing at the time.
+
+    def __init__(self, outliers=10):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.outliers = {}
+        self.max_outliers = outliers
+        self.started = datetime.now()
+        self.start_wall = time.perf_counter()
+
+    def reset(self):
+        # Start a new report, e.g. for each pass of a long-running watch
+        with self.lock:
+            self.stages = {}
+            self.outliers = {}
+            self.started = datetime.now()
+            self.start_wall = time.perf_counter()
+
+    def add(self, name, wall, cpu=0.0):
+        with self.lock:
+            stage = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'count': 0})
+            stage['wall'] += wall
+            stage['cpu'] += cpu
+            stage['count'] += 1
+
+    @contextmanager
+    def stage(self, name, item=None):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            self.add(name, wall, time.thread_time() - cpu_start)
+            if item is not None:
+                self.record_outlier(name, item, wall)
+
+    def record_outlier(self, name, item, seconds):
+        # Keep only the slowest max_outliers items per stage (a min-heap of the largest)
+        with self.lock:
+            heap = self.outliers.setdefault(name, [])
+            entry = (seconds, str(item))
+            if len(heap) < self.max_outliers:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    def report(self, **extra):
+        with self.lock:
+            stages = {name: {'wall_s': round(stage['wall'], 4), 'cpu_s': round(stage['cpu'], 4),
+                             'count': stage['count']}
+                      for name, stage in self.stages.items()}
+            outliers = {name: [{'item': item, 'wall_s': round(seconds, 4)}
+                               for seconds, item in sorted(heap, reverse=True)]
+                        for name, heap in self.outliers.items()}
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'total_wall_s': round(time.perf_counter() - self.start_wall, 4),
+            'total_cpu_s': round(time.process_time(), 4),
+            'stages': stages,
+            'slowest': outliers,
+            **extra,
+        }
+
+    def write_report(self, path, **extra):
+        save_json(path, self.report(**extra), indent=2, sort_keys=False, default=str)
+
+
+# Shared by every stage of a run, like the logging module's root logger
+timer = RunTimer()
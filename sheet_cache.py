@@ -0,0 +1,53 @@
+import hashlib
+import logging
+import os
+
+import pandas as pd
+
+from atomic_file import replacing
+from run_report import timer
+
+# Parsed sheets are cached as pandas pickles: they store the DataFrame's column blocks
+# directly and, unlike parquet, cope with the mixed-type columns the workbook has
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'vaultez')
+
+
+def snapshot_path(input_file, sheet_name, cache_dir=DEFAULT_CACHE_DIR):
+    # One file per workbook and sheet, named after the workbook's size and mtime,
+    # so saving the workbook produces a new name and the old snapshot goes stale
+    input_file = os.path.abspath(input_file)
+    st = os.stat(input_file)
+    source_key = hashlib.sha1(f"{input_file}|{sheet_name}".encode('utf-8')).hexdigest()[:16]
+    version_key = hashlib.sha1(f"{st.st_size}|{st.st_mtime_ns}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{source_key}.{version_key}.pkl"), source_key
+
+
+def read_sheet(input_file, sheet_name, cache_dir=DEFAULT_CACHE_DIR):
+    if cache_dir is None:
+        with timer.stage('excel_load'):
+            return pd.read_excel(input_file, sheet_name=sheet_name, engine='openpyxl')
+
+    path, source_key = snapshot_path(input_file, sheet_name, cache_dir)
+    if os.path.exists(path):
+        try:
+            with timer.stage('snapshot_load'):
+                df = pd.read_pickle(path)
+            logging.info(f"Loaded cached snapshot of sheet {sheet_name}: {path}")
+            return df
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable sheet snapshot {path}: {str(e)}")
+
+    with timer.stage('excel_load'):
+        df = pd.read_excel(input_file, sheet_name=sheet_name, engine='openpyxl')
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop snapshots of earlier versions of this workbook before writing the new one
+        for name in os.listdir(cache_dir):
+            if name.startswith(source_key + '.'):
+                os.remove(os.path.join(cache_dir, name))
+        with timer.stage('snapshot_save'), replacing(path) as tmp_path:
+            df.to_pickle(tmp_path)
+        logging.info(f"Saved snapshot of sheet {sheet_name}: {path}")
+    except OSError as e:
+        logging.warning(f"Could not save sheet snapshot {path}: {str(e)}")
+    return df
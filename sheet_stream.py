@@ -0,0 +1,70 @@
+import logging
+import time
+
+import pandas as pd
+
+from run_report import timer
+
+
+class SheetStream:
+    # Reads the sheet row by row through openpyxl's read_only mode and yields small
+    # DataFrames of the rows whose Src is wanted, so memory stays flat however large
+    # the sheet is. Only the requested columns are kept (None keeps them all). The
+    # index is the row's position below the header, as pd.read_excel would number it.
+
+    def __init__(self, input_file, sheet_name, sources=None, columns=None, chunk_size=500):
+        self.input_file = input_file
+        self.sheet_name = sheet_name
+        self.sources = set(sources) if sources is not None else None
+        self.columns = set(columns) if columns is not None else None
+        self.chunk_size = chunk_size
+        self.rows_read = 0
+        self.rows_skipped = 0
+
+    def __iter__(self):
+        import openpyxl
+
+        wb = openpyxl.load_workbook(self.input_file, read_only=True, data_only=True, keep_links=False)
+        try:
+            rows = wb[self.sheet_name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            if 'Src' not in header:
+                raise ValueError(f"Sheet {self.sheet_name} has no Src column")
+            keep = [i for i, name in enumerate(header) if self.columns is None or name in self.columns
+                    or name == 'Src']
+            names = [header[i] for i in keep]
+            src_at = header.index('Src')
+            logging.info(f"Streaming {len(names)} of {len(header)} columns from sheet {self.sheet_name}")
+
+            chunk, index = [], []
+            start = time.perf_counter()
+            cpu = time.thread_time()
+            for position, values in enumerate(rows):
+                if not any(value is not None for value in values):
+                    continue
+                self.rows_read += 1
+                src = values[src_at] if src_at < len(values) else None
+                if self.sources is not None and src not in self.sources:
+                    self.rows_skipped += 1
+                    continue
+                chunk.append([values[i] if i < len(values) else None for i in keep])
+                index.append(position)
+                if len(chunk) >= self.chunk_size:
+                    timer.add('excel_stream', time.perf_counter() - start, time.thread_time() - cpu)
+                    yield self.frame(chunk, index, names)
+                    chunk, index = [], []
+                    start = time.perf_counter()
+                    cpu = time.thread_time()
+            timer.add('excel_stream', time.perf_counter() - start, time.thread_time() - cpu)
+            if chunk:
+                yield self.frame(chunk, index, names)
+        finally:
+            wb.close()
+
+    def frame(self, chunk, index, names):
+        # dtype=object keeps cell values as openpyxl returned them, so a value renders
+        # the same whichever other rows happen to share its chunk
+        return pd.DataFrame(chunk, index=index, columns=names, dtype=object)
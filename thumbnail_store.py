@@ -0,0 +1,114 @@
+import argparse
+import hashlib
+import os
+from collections import namedtuple
+
+from import_manifest import hash_file
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png'}
+
+# One output size of every scan. Notes embed the smallest profile by default and can
+# name any other one through {{thumbnail_<name>}} / {{thumbnail_embed_<name>}}
+ThumbnailProfile = namedtuple('ThumbnailProfile', ['name', 'size', 'fmt', 'quality', 'grayscale'])
+
+DEFAULT_PROFILES = [ThumbnailProfile('small', (300, 300), 'JPEG', 75, False)]
+
+
+def parse_profiles(text):
+    # "name:WxH:FORMAT[:quality][:gray]" entries separated by commas,
+    # e.g. "small:160x160:webp:60:gray,large:800x800:jpeg:80"
+    profiles = []
+    for spec in text.split(','):
+        parts = [part.strip() for part in spec.split(':')]
+        try:
+            name, size, fmt = parts[0], parts[1], parts[2].upper()
+            width, height = (int(v) for v in size.lower().split('x'))
+        except (IndexError, ValueError):
+            raise argparse.ArgumentTypeError(f"expected name:WxH:FORMAT[:quality][:gray], got {spec!r}")
+        if fmt == 'JPG':
+            fmt = 'JPEG'
+        if fmt not in FORMAT_EXTENSIONS:
+            raise argparse.ArgumentTypeError(f"unsupported thumbnail format {parts[2]!r} in {spec!r}")
+        extra = parts[3:]
+        grayscale = 'gray' in extra
+        numbers = [v for v in extra if v != 'gray']
+        quality = int(numbers[0]) if numbers else 75
+        profiles.append(ThumbnailProfile(name, (width, height), fmt, quality, grayscale))
+    if len({profile.name for profile in profiles}) != len(profiles):
+        raise argparse.ArgumentTypeError("thumbnail profile names must be unique")
+    return profiles
+
+
+class ThumbnailStore:
+    # Thumbnails are named after a hash of the source *contents* plus the thumbnail
+    # parameters, so identical scans share one file and a renamed scan maps onto the
+    # thumbnail it already has. If the named file exists it is up to date by construction.
+
+    def __init__(self, thumbnails_dir, profiles=DEFAULT_PROFILES, manifest=None):
+        self.thumbnails_dir = thumbnails_dir
+        # Smallest first: that is the one embedded by {{thumbnail_embed}}
+        self.profiles = sorted(profiles, key=lambda profile: (profile.size[0] * profile.size[1], profile.name))
+        # Source hashes come from the import manifest's cache when there is one
+        self.manifest = manifest
+        self.reused = 0
+        # Thumbnails used by the notes of this run, per profile, for the size report
+        self.referenced = {profile.name: set() for profile in self.profiles}
+
+    def source_hash(self, file_path):
+        if self.manifest is not None:
+            file_hash = self.manifest.image_hash(file_path)
+            if file_hash is not None:
+                return file_hash
+        return hash_file(file_path)
+
+    @property
+    def signature(self):
+        # Changes whenever a profile is added, removed or altered
+        return ';'.join(f"{p.name}|{p.size[0]}x{p.size[1]}|{p.fmt}|{p.quality}|{p.grayscale}" for p in self.profiles)
+
+    def thumbnail_name(self, file_path, source_hash=None, profile=None):
+        if source_hash is None:
+            source_hash = self.source_hash(file_path)
+        profile = profile or self.profiles[0]
+        # The profile name is left out, so renaming a profile keeps its files
+        params = f"{source_hash}|{profile.size[0]}x{profile.size[1]}|{profile.fmt}|{profile.quality}"
+        if profile.grayscale:
+            params += "|gray"
+        key = hashlib.sha1(params.encode('utf-8')).hexdigest()[:20]
+        return f"thumb_{key}.{FORMAT_EXTENSIONS[profile.fmt]}"
+
+    def names(self, file_path, source_hash=None):
+        # {profile name: thumbnail filename} for one source
+        if source_hash is None:
+            source_hash = self.source_hash(file_path)
+        return {profile.name: self.thumbnail_name(file_path, source_hash, profile) for profile in self.profiles}
+
+    def lookup(self, file_path, source_hash=None):
+        # Returns every profile's filename and the (path, profile) pairs still to be rendered
+        names = self.names(file_path, source_hash)
+        missing = []
+        for profile in self.profiles:
+            thumbnail_path = os.path.join(self.thumbnails_dir, names[profile.name])
+            if os.path.exists(thumbnail_path):
+                self.reused += 1
+            else:
+                missing.append((thumbnail_path, profile))
+        return names, missing
+
+    def reference(self, names):
+        for profile_name, thumbnail_filename in (names or {}).items():
+            if profile_name in self.referenced:
+                self.referenced[profile_name].add(thumbnail_filename)
+
+    def profile_bytes(self):
+        # Bytes on disk of the thumbnails the vault's notes use, per profile
+        totals = {}
+        for profile in self.profiles:
+            total = 0
+            for thumbnail_filename in self.referenced[profile.name]:
+                try:
+                    total += os.path.getsize(os.path.join(self.thumbnails_dir, thumbnail_filename))
+                except OSError:
+                    pass
+            totals[profile] = total
+        return totals
@@ -0,0 +1,141 @@
+import argparse
+import logging
+import os
+import traceback
+
+from import_pipeline import add_run_options, add_stream_options, run_importers, setup_logging, stream_importers
+from run_report import timer
+from note_template import NoteTemplate
+from sheet_cache import DEFAULT_CACHE_DIR, read_sheet
+from Obsidian_newspaper_import_v15 import NewspaperImporter, add_thumbnail_options, max_decode_bytes, thumbnail_budget
+from Obsidian_census_import import CensusImporter
+from census_households import add_household_options
+from record_index import add_records_options, open_records
+from watch import SheetWatcher
+
+# Importers run by a full vault refresh, keyed by name. Each factory receives the vault
+# folder and the parsed arguments; register a new Src type by adding an entry here
+# (or calling register_importer before main)
+IMPORTERS = {}
+
+
+def register_importer(name, factory):
+    IMPORTERS[name] = factory
+
+
+def load_template(path):
+    return NoteTemplate.from_file(path) if path else None
+
+
+def newspaper_importer(vault_dir, args):
+    template = load_template(args.newspaper_template)
+    kwargs = {'template': template} if template else {}
+    return NewspaperImporter(os.path.join(vault_dir, 'Newspapers'), full=args.full, workers=args.workers,
+                             writer_threads=args.writer_threads, index=not args.no_index,
+                             thumbnail_profiles=args.thumbnail_profiles, thumbnail_budget=thumbnail_budget(args),
+                             records=args.records, max_decode_bytes=max_decode_bytes(args), **kwargs)
+
+
+def census_importer(vault_dir, args):
+    template = load_template(args.census_template)
+    kwargs = {'template': template} if template else {}
+    return CensusImporter(os.path.join(vault_dir, 'Census'), writer_threads=args.writer_threads,
+                          records=args.records, household_key=args.household_key if args.households else None,
+                          full=args.full, **kwargs)
+
+
+register_importer('newspapers', newspaper_importer)
+register_importer('census', census_importer)
+
+
+def add_watch_options(parser):
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and re-import whatever changes in the workbook or Images folders")
+    parser.add_argument('--interval', type=float, default=0.5, help="Seconds between polls in --watch mode")
+
+
+def watch(args):
+    names = args.only or list(IMPORTERS)
+    images_dirs = [os.path.join(args.vault, 'Newspapers', 'Images')] if 'newspapers' in names else []
+
+    def run_pass(df, only):
+        args.records = open_records(args, os.path.join(args.vault, 'Newspapers'))
+        try:
+            importers = [IMPORTERS[name](args.vault, args) for name in names]
+            for importer in importers:
+                importer.only = only
+            summaries = run_importers(df, importers)
+            timer.write_report(args.report, input=args.input, summaries=dict(summaries))
+        finally:
+            if args.records is not None:
+                args.records.close()
+        # --full applies to the first pass only
+        args.full = False
+
+    SheetWatcher(args.input, args.sheet, images_dirs, run_pass, None if args.no_cache else args.cache_dir,
+                 args.interval).run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh every imported section of the vault from one workbook pass")
+    parser.add_argument('--input', default=r"G:/Projects/Clwyd Hall/_Resources/Clwyd Hall Project.xlsm")
+    parser.add_argument('--vault', default=r"G:/Projects/Obsidian/Vaultez")
+    parser.add_argument('--sheet', default="Newspapers")
+    parser.add_argument('--only', action='append', choices=sorted(IMPORTERS),
+                        help="Run only the named importer (may be repeated)")
+    parser.add_argument('--full', action='store_true',
+                        help="Regenerate every note, ignoring import manifests")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes for thumbnail generation (1 = serial)")
+    parser.add_argument('--writer-threads', type=int, default=4,
+                        help="Number of threads writing notes behind rendering (0 = write inline)")
+    parser.add_argument('--no-index', action='store_true',
+                        help="Do not build the newspaper Index/People, Places and Themes hub notes")
+    add_thumbnail_options(parser)
+    add_household_options(parser)
+    add_records_options(parser)
+    parser.add_argument('--newspaper-template', help="Markdown template file for newspaper notes")
+    parser.add_argument('--census-template', help="Markdown template file for census notes")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help="Folder for cached snapshots of the parsed sheet")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the workbook")
+    add_stream_options(parser)
+    add_watch_options(parser)
+    add_run_options(parser, 'vault_import_report.json')
+    args = parser.parse_args(argv)
+    if args.watch and args.stream:
+        parser.error("--watch keeps the whole sheet in memory and cannot be combined with --stream")
+
+    setup_logging('vault_import_log.txt', args.log_level)
+    if args.watch:
+        return watch(args)
+
+    # One database at the root of the vault, shared by every importer
+    args.records = None
+
+    try:
+        args.records = open_records(args, os.path.join(args.vault, 'Newspapers'))
+        names = args.only or list(IMPORTERS)
+        importers = [IMPORTERS[name](args.vault, args) for name in names]
+
+        if args.stream:
+            logging.info(f"Streaming Excel file: {args.input}")
+            summaries = stream_importers(args.input, args.sheet, importers, args.chunk_size)
+        else:
+            logging.info(f"Reading Excel file: {args.input}")
+            df = read_sheet(args.input, args.sheet, None if args.no_cache else args.cache_dir)
+            logging.info(f"Successfully read {len(df)} records from Excel")
+
+            summaries = run_importers(df, importers)
+        timer.write_report(args.report, input=args.input, summaries=dict(summaries))
+
+    except Exception as e:
+        logging.error(f"Error processing Excel file: {str(e)}")
+        logging.debug(traceback.format_exc())
+    finally:
+        if args.records is not None:
+            args.records.close()
+
+
+if __name__ == "__main__":
+    main()
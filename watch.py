@@ -0,0 +1,151 @@
+import logging
+import os
+import time
+import traceback
+
+import pandas as pd
+
+from row_prep import base_filenames
+from run_report import timer
+from sheet_cache import read_sheet
+
+# Long-running import: the parsed sheet and the state of each Images/ folder stay in
+# memory and are polled. A change is only acted on once it has been stable for one
+# poll, so a workbook mid-save or a scan mid-copy is not read half-written.
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def folder_signature(directory):
+    # {lowercased name: (size, mtime_ns)} from one scandir
+    state = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith('.'):
+                    st = entry.stat()
+                    state[entry.name.lower()] = (st.st_size, st.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return state
+
+
+def row_hashes(df):
+    # One 64-bit hash per row, keyed by the row's position in the sheet
+    return pd.util.hash_pandas_object(df, index=False)
+
+
+def changed_rows(old_hashes, new_hashes):
+    # Labels of rows that are new or differ; removed rows need no render of their own
+    common = new_hashes.index.intersection(old_hashes.index)
+    changed = set(common[new_hashes[common].to_numpy() != old_hashes[common].to_numpy()])
+    changed.update(new_hashes.index.difference(old_hashes.index))
+    return changed
+
+
+def rows_for_images(df, names):
+    # Rows whose Full_Filename points at one of these files, by name or by stem, the
+    # same way ImageIndex resolves them
+    if not names or 'Full_Filename' not in df.columns:
+        return set()
+    stems = {os.path.splitext(name)[0] for name in names}
+    filenames = base_filenames(df['Full_Filename']).str.lower()
+    matches = filenames.isin(names) | filenames.str.replace(r'\.[^.]*$', '', regex=True).isin(stems)
+    return set(df.index[matches.fillna(False).astype(bool)])
+
+
+class SheetWatcher:
+    # run_pass(df, only) imports df, rendering only the rows whose labels are in only
+    # (None renders whatever the manifests say is out of date, i.e. a normal run)
+
+    def __init__(self, input_file, sheet_name, images_dirs, run_pass, cache_dir=None, interval=0.5):
+        self.input_file = input_file
+        self.sheet_name = sheet_name
+        self.images_dirs = list(images_dirs)
+        self.run_pass = run_pass
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self.df = None
+        self.hashes = None
+        self.sheet_state = None
+        self.image_states = {}
+        self.passes = 0
+
+    def load_sheet(self):
+        df = read_sheet(self.input_file, self.sheet_name, self.cache_dir)
+        logging.info(f"Read {len(df)} records from {self.input_file}")
+        return df, row_hashes(df)
+
+    def import_pass(self, only):
+        start = time.perf_counter()
+        timer.reset()
+        self.run_pass(self.df, only)
+        self.passes += 1
+        elapsed = time.perf_counter() - start
+        rows = 'all rows' if only is None else f"{len(only)} changed row(s)"
+        print(f"[{time.strftime('%H:%M:%S')}] Import pass {self.passes} over {rows}: {elapsed:.2f}s")
+        logging.info(f"Import pass {self.passes} over {rows} took {elapsed:.2f}s")
+
+    def poll(self, sheet_state, sheet_seen, image_states, images_seen):
+        # Compares this poll's state with the last import and the previous poll; returns
+        # the labels of rows to re-render, or 'all' for a normal pass
+        affected = set()
+        if sheet_state != self.sheet_state and sheet_state == sheet_seen:
+            try:
+                df, hashes = self.load_sheet()
+            except Exception as e:
+                # Usually Excel still holding the file; try again on the next poll
+                logging.warning(f"Could not read {self.input_file} yet: {str(e)}")
+                return affected
+            affected |= changed_rows(self.hashes, hashes)
+            removed = len(self.hashes.index.difference(hashes.index))
+            logging.info(f"Workbook changed: {len(affected)} row(s) new or edited, {removed} removed")
+            self.df, self.hashes, self.sheet_state = df, hashes, sheet_state
+            if removed:
+                # Shifted or deleted rows can rename notes; a normal pass sorts that out
+                return 'all'
+
+        for directory in self.images_dirs:
+            state = image_states[directory]
+            previous = self.image_states[directory]
+            if state == previous or state != images_seen.get(directory):
+                continue
+            names = {name for name in state.keys() | previous.keys() if state.get(name) != previous.get(name)}
+            logging.info(f"{len(names)} file(s) added, changed or removed in {directory}")
+            affected |= rows_for_images(self.df, names)
+            self.image_states[directory] = state
+        return affected
+
+    def run(self):
+        self.df, self.hashes = self.load_sheet()
+        self.sheet_state = file_signature(self.input_file)
+        self.image_states = {directory: folder_signature(directory) for directory in self.images_dirs}
+        self.import_pass(None)
+        print(f"Watching {self.input_file} and {', '.join(self.images_dirs)} (Ctrl+C to stop)")
+
+        # What the previous poll saw; a change is picked up once two polls agree
+        sheet_seen = self.sheet_state
+        images_seen = dict(self.image_states)
+        try:
+            while True:
+                time.sleep(self.interval)
+                sheet_state = file_signature(self.input_file)
+                image_states = {directory: folder_signature(directory) for directory in self.images_dirs}
+                try:
+                    affected = self.poll(sheet_state, sheet_seen, image_states, images_seen)
+                    if affected == 'all':
+                        self.import_pass(None)
+                    elif affected:
+                        self.import_pass(affected)
+                except Exception as e:
+                    logging.error(f"Error in watch pass: {str(e)}")
+                    logging.debug(traceback.format_exc())
+                sheet_seen, images_seen = sheet_state, image_states
+        except KeyboardInterrupt:
+            print("Stopped watching")